@@ -3,6 +3,7 @@ from flask import Flask
 from mongoengine import connect
 from dotenv import load_dotenv
 from flask_cors import CORS
+from utils.response import OrjsonProvider
 
 # Blueprints
 from routes.admin.login import login_bp
@@ -58,16 +59,31 @@ CELERY_RESULT_BACKEND = os.getenv("CELERY_RESULT_BACKEND", "redis://localhost:63
 
 def create_app():
     app = Flask(__name__)
+    # jsonify() / get_json() use the same orjson encoding as utils.response
+    app.json = OrjsonProvider(app)
 
     # Flask config
     CORS(app, resources={r"/*": {"origins": "*"}})
     app.config["SECRET_KEY"] = os.getenv("SECRET_KEY", "fallback-secret")
+    # hard cap on request bodies (2 MiB, raise via env if large question payloads need it);
+    # werkzeug answers 413 before any parsing
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_CONTENT_LENGTH", 2 * 1024 * 1024))
      # ✅ Celery config so the worker and app share settings
     app.config["CELERY_BROKER_URL"] = CELERY_BROKER_URL
     app.config["CELERY_RESULT_BACKEND"] = CELERY_RESULT_BACKEND
 
     # Connect to MongoDB Atlas
-    connect(host=os.getenv("MONGO_URI"))
+    # one pool per gunicorn worker: peak connections = workers x MONGO_MAX_POOL_SIZE,
+    # keep that under the cluster's connection limit
+    connect(
+        host=os.getenv("MONGO_URI"),
+        maxPoolSize=int(os.getenv("MONGO_MAX_POOL_SIZE", 100)),
+        minPoolSize=int(os.getenv("MONGO_MIN_POOL_SIZE", 10)),
+        maxIdleTimeMS=int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000)),
+        socketTimeoutMS=int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 20000)),
+        serverSelectionTimeoutMS=int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000)),
+        retryWrites=True,
+    )
 
     # Register blueprints
     app.register_blueprint(login_bp, url_prefix="/admin")
@@ -0,0 +1,62 @@
+# dedupe_test_attempts.py
+"""
+One-off cleanup that has to run before the unique (test_id, student_id) index
+on student_test_assignments can be built.
+
+For every (test_id, student_id) pair with more than one attempt it keeps one:
+submitted first, then the latest submitted_at, then the latest last_autosave,
+then the newest _id. The rest are deleted. It runs dry by default; with --apply
+it deletes the extra attempts and then builds the model's indexes.
+
+    python dedupe_test_attempts.py            # report only
+    python dedupe_test_attempts.py --apply    # delete duplicates + build indexes
+"""
+import os
+import sys
+
+from dotenv import load_dotenv
+from mongoengine import connect, get_db
+
+from models.test.students_test_attempt import StudentTestAttempt
+
+
+def main(apply: bool):
+    load_dotenv()
+    connect(host=os.getenv("MONGO_URI"))
+
+    # raw collection: StudentTestAttempt._get_collection() would try to build the
+    # unique index first and fail on the very duplicates we are removing
+    coll = get_db()[StudentTestAttempt._get_collection_name()]
+
+    groups = coll.aggregate([
+        {"$sort": {"submitted": -1, "submitted_at": -1, "last_autosave": -1, "_id": -1}},
+        {"$group": {
+            "_id": {"test_id": "$test_id", "student_id": "$student_id"},
+            "ids": {"$push": "$_id"},
+            "n": {"$sum": 1},
+        }},
+        {"$match": {"n": {"$gt": 1}}},
+    ], allowDiskUse=True)
+
+    extra_ids = []
+    pairs = 0
+    for g in groups:
+        pairs += 1
+        keep, drop = g["ids"][0], g["ids"][1:]
+        print(f"test={g['_id'].get('test_id')} student={g['_id'].get('student_id')}: "
+              f"keep {keep}, drop {len(drop)}")
+        extra_ids.extend(drop)
+
+    print(f"{pairs} duplicated pairs, {len(extra_ids)} attempts to delete")
+    if not apply:
+        print("dry run; pass --apply to delete them and build the indexes")
+        return
+
+    for i in range(0, len(extra_ids), 1000):
+        coll.delete_many({"_id": {"$in": extra_ids[i:i + 1000]}})
+    StudentTestAttempt.ensure_indexes()
+    print("duplicates deleted, indexes built")
+
+
+if __name__ == "__main__":
+    main(apply="--apply" in sys.argv[1:])
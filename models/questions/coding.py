@@ -206,6 +206,18 @@ class Question(BaseQuestion):
             ("published", "topic"),
             {"fields": ["tags"], "sparse": True},
             {"fields": ["allowed_languages"], "sparse": True},  # optional: query by language
+            # list filters + newest-first / points / time limit sorts
+            ("topic", "-id"),
+            ("subtopic", "-id"),
+            ("difficulty", "-id"),
+            ("tags", "-id"),
+            ("-points", "-id"),
+            ("-time_limit_ms", "-id"),
+            # list search over title/descriptions
+            {
+                "fields": ["$title", "$short_description", "$long_description_markdown"],
+                "default_language": "english",
+            },
         ]
     }
 
@@ -50,6 +50,25 @@ class MCQConfig(Document):
     meta = {"collection": "mcq_configs"}
 
 
+def update_mcq_config(collection_name, topics=(), subtopics=(), tags=(), difficulty_levels=()):
+    """Atomically add facet values to a collection's MCQConfig ($addToSet, upserted)."""
+    add = {}
+    for field, values in (
+        ("topics", topics),
+        ("subtopics", subtopics),
+        ("tags", tags),
+        ("difficulty_levels", difficulty_levels),
+    ):
+        values = [v for v in values if v]
+        if values:
+            add[field] = {"$each": values}
+    if not add:
+        return
+    MCQConfig._get_collection().update_one(
+        {"collection_name": collection_name}, {"$addToSet": add}, upsert=True
+    )
+
+
 # ------------------------
 # Abstract/Base MCQ model
 # ------------------------
@@ -103,24 +122,13 @@ class BaseMCQ(Document):
         # Try to determine the collection name for this concrete class
         collection_name = self._meta.get("collection") or getattr(self, "__class__").__name__.lower()
 
-        config = MCQConfig.objects(collection_name=collection_name).first()
-        if not config:
-            config = MCQConfig(collection_name=collection_name)
-
-        if self.difficulty_level and self.difficulty_level not in config.difficulty_levels:
-            config.difficulty_levels.append(self.difficulty_level)
-
-        if self.topic and self.topic not in config.topics:
-            config.topics.append(self.topic)
-
-        if self.subtopic and self.subtopic not in config.subtopics:
-            config.subtopics.append(self.subtopic)
-
-        for tag in self.tags or []:
-            if tag and tag not in config.tags:
-                config.tags.append(tag)
-
-        config.save()
+        update_mcq_config(
+            collection_name,
+            topics=[self.topic],
+            subtopics=[self.subtopic],
+            tags=self.tags or [],
+            difficulty_levels=[self.difficulty_level],
+        )
 
     # ------------------------
     # Save override
@@ -226,7 +234,16 @@ class TestMCQ(BaseMCQ):
 class CollegeMCQ(BaseMCQ):
     college_id = StringField(required=True)  # ✅ mandatory field for college linkage
 
-    meta = {"collection": "college_mcqs"}
+    meta = {
+        "collection": "college_mcqs",
+        # serve the list_mcqs filters/sorts without collection scans
+        "indexes": [
+            ("topic", "subtopic", "difficulty_level"),
+            "tags",
+            ("difficulty_level", "marks"),
+            {"fields": ["$title", "$question_text"], "default_language": "english"},
+        ],
+    }
 
     def to_json(self):
         base_json = super().to_json()
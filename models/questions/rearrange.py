@@ -219,7 +219,20 @@ class BaseRearrange(Document):
 # ------------------------
 class Rearrange(BaseRearrange):
     """Model for a 'rearrange these items in correct order' question"""
-    meta = {"collection": "rearranges"}
+    meta = {
+        "collection": "rearranges",
+        "indexes": [
+            # list filters + newest-first / marks / time limit sorts
+            ("topic", "-id"),
+            ("subtopic", "-id"),
+            ("difficulty_level", "-id"),
+            ("tags", "-id"),
+            ("-marks", "-id"),
+            ("-time_limit", "-id"),
+            # list search over title/prompt
+            {"fields": ["$title", "$prompt"], "default_language": "english"},
+        ],
+    }
     
 class CourseRearrange(BaseRearrange):
     """Model for a 'rearrange these items in correct order' question"""
@@ -6,6 +6,7 @@ from mongoengine import (
     NULLIFY
 )
 from werkzeug.security import generate_password_hash, check_password_hash
+from utils.cache import invalidate_student_meta
 class Student(Document):
     # Basic details
     name = StringField(required=True)
@@ -46,13 +47,29 @@ class Student(Document):
         "indexes": [
             {"fields": ["email"], "unique": True},
             {"fields": ["usn"], "unique": True, "sparse": True},
-            {"fields": ["enrollment_number"], "unique": True, "sparse": True}
+            {"fields": ["enrollment_number"], "unique": True, "sparse": True},
+            # (college, sort field, _id) backs the keyset-paginated student lists
+            ("college", "name", "id"),
+            ("college", "usn", "id"),
+            ("college", "year_of_study", "id"),
+            ("college", "semester", "id"),
+            ("college", "cgpa", "id"),
+            # covers the per-college branch/year/semester facet aggregation
+            ("college", "branch", "year_of_study", "semester"),
+            # full-text search over the student list search fields
+            {"fields": ["$name", "$usn", "$email"], "default_language": "english"},
         ]
     }
 
     def __str__(self):
         return f"{self.usn or 'N/A'} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        """Override save to drop the cached filter meta of the student's college"""
+        result = super(Student, self).save(*args, **kwargs)
+        invalidate_student_meta(self._data.get("college"))
+        return result
+
     def set_password(self, password: str):
         print(password)
         self.password_hash = generate_password_hash(password)
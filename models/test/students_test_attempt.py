@@ -101,7 +101,15 @@ class StudentTestAttempt(Document):
     submitted_at = DateTimeField(null=True)
     meta = {
         "collection": "student_test_assignments",
-        "indexes": [("student_id", "test_id"), "student_id", "test_id"],
+        "indexes": [
+            # one attempt per student per test; bulk_assign relies on this to skip duplicates.
+            # student_id leads so the student-side "my tests" lookups use it too
+            # (existing deployments: run dedupe_test_attempts.py --apply before this builds)
+            {"fields": ["student_id", "test_id"], "unique": True},
+            # faculty result pages: filter by test, newest submission first,
+            # _id as the keyset tie-breaker
+            ("test_id", "-submitted_at", "-id"),
+        ],
     }
 
     # ------------------------
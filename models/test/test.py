@@ -10,6 +10,7 @@ from mongoengine import (
     IntField,
 )
 from models.test.section import Section
+from utils.cache import invalidate_test_meta
 
 
 class Test(Document):
@@ -46,7 +47,14 @@ class Test(Document):
     sections_time_restricted = ListField(ReferenceField("Section", reverse_delete_rule=PULL))
     sections_open = ListField(ReferenceField("Section", reverse_delete_rule=PULL))
 
-    meta = {"collection": "tests", "indexes": ["start_datetime", "end_datetime", "test_name"]}
+    meta = {
+        "collection": "tests",
+        "indexes": [
+            "start_datetime", "end_datetime", "test_name",
+            # multikey: find the tests holding a section (ref moves, deletes)
+            "sections_time_restricted", "sections_open",
+        ],
+    }
 
     def clean(self):
         """Validation before saving"""
@@ -60,7 +68,14 @@ class Test(Document):
         self.updated_at = datetime.utcnow()
         if not self.created_at:
             self.created_at = datetime.utcnow()
-        return super(Test, self).save(*args, **kwargs)
+        result = super(Test, self).save(*args, **kwargs)
+        invalidate_test_meta(self.id)
+        return result
+
+    def delete(self, *args, **kwargs):
+        """Delete and drop the test's cached meta"""
+        invalidate_test_meta(self.id)
+        return super(Test, self).delete(*args, **kwargs)
 
     # ----------------------
     # Helper: serialize lists of section references
@@ -5,6 +5,7 @@ from mongoengine.errors import NotUniqueError, ValidationError, FieldDoesNotExis
 # from tasks.mail_tasks import send_mail
 from utils.response import response
 from utils.jwt import create_access_token, verify_access_token
+from utils.cache import invalidate_student_meta
 from models.college import College
 bp = Blueprint("students_bp", __name__, url_prefix="/students")
 
@@ -655,6 +656,7 @@ def update_student_by_id(student_id):
             return response(False, "Student not found"), 404
 
         qs.update(**update_kwargs)
+        invalidate_student_meta(college)
         student = Student.objects.get(id=student_id, college=college)
         out = {"id": str(student.id)}
         for f in UPDATE_ALLOWED:
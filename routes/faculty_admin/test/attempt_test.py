@@ -1,11 +1,18 @@
 # routes/assignments.py  (add this to your file)
 from flask import Blueprint, request, current_app as app
-from mongoengine.errors import ValidationError, NotUniqueError, DoesNotExist
+from mongoengine.errors import DoesNotExist
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from mongoengine.queryset.visitor import Q
 from bson import ObjectId
-from functools import wraps
+from functools import wraps, lru_cache
+import base64
+import json
 
 from utils.response import response
 from utils.jwt import verify_access_token
+from utils.cache import get_student_meta, set_student_meta
+from utils.search import prefix_search_filter
 
 from models.student import Student
 from models.test.test import Test
@@ -34,6 +41,150 @@ def token_required(f):
 
 # ... keep your token_required decorator above ...
 
+_ACADEMIC_FIELDS = (
+    "usn", "enrollment_number", "branch", "year_of_study",
+    "semester", "cgpa", "college", "name", "email"
+)
+
+
+def student_academic_to_json(s: dict) -> dict:
+    """
+    Minimal academic representation built from a raw (as_pymongo) Student dict.
+    `college` is the stored ObjectId, so no College lookup happens here.
+    """
+    return {
+        "id": str(s["_id"]),
+        "name": s.get("name"),
+        "email": s.get("email"),
+        "usn": s.get("usn"),
+        "enrollment_number": s.get("enrollment_number"),
+        "branch": s.get("branch"),
+        "year_of_study": s.get("year_of_study"),
+        "semester": s.get("semester"),
+        "cgpa": s.get("cgpa"),
+        "college": str(s["college"]) if s.get("college") else None
+    }
+
+
+def _encode_cursor(sort_value, doc_id) -> str:
+    """Opaque `after` cursor carrying the last row's (sort value, id)."""
+    raw = json.dumps([sort_value, str(doc_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def _decode_cursor(cursor: str):
+    """Inverse of _encode_cursor; raises ValueError on a malformed cursor."""
+    try:
+        sort_value, doc_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return sort_value, ObjectId(doc_id)
+    except Exception:
+        raise ValueError("invalid after cursor")
+
+
+def _keyset_filter(sort_by: str, descending: bool, last_value, last_id) -> Q:
+    """
+    Q selecting rows strictly after (last_value, last_id) in (sort_by, _id)
+    order, so the next page is an index seek instead of a skip().
+    """
+    op = "lt" if descending else "gt"
+    after_id = Q(**{f"id__{op}": last_id})
+    if last_value is None:
+        # nulls sort before every other value ascending and after them descending
+        same = Q(**{sort_by: None}) & after_id
+        return same if descending else (same | Q(**{f"{sort_by}__ne": None}))
+    return Q(**{f"{sort_by}__{op}": last_value}) | (Q(**{sort_by: last_value}) & after_id)
+
+
+# max ids per $in / insert_many command in the bulk assign/unassign endpoints
+_BATCH = 1000
+# request limits for the bulk endpoints
+_MAX_BULK_IDS = 10000
+_MAX_BULK_BODY = 2 * 1024 * 1024
+
+_ALLOWED_SORTS = frozenset({"name", "usn", "year_of_study", "semester", "cgpa"})
+
+
+def _split_vals(val):
+    """Split a comma separated query param into non-empty stripped parts."""
+    if val is None:
+        return None
+    parts = [v.strip() for v in str(val).split(",") if v.strip() != ""]
+    return parts or None
+
+
+def _as_oid_or_str(v):
+    """ObjectId for valid ObjectId strings, else the value as a plain string."""
+    return ObjectId(v) if ObjectId.is_valid(v) else str(v)
+
+
+def _ensure_test_exists(test_id) -> str:
+    """
+    Check the Test exists with an id-only count (no document fetch) and return
+    its id as stored on StudentTestAttempt.test_id. Raises DoesNotExist.
+    """
+    oid = _as_oid_or_str(test_id)
+    if not Test._get_collection().count_documents({"_id": oid}, limit=1):
+        raise DoesNotExist(f"Test not found for id: {test_id}")
+    return str(oid)
+
+
+@lru_cache(maxsize=4096)
+def _college_filter(college_id):
+    """College reference value for queries: ObjectId when possible, else the raw string."""
+    return _as_oid_or_str(college_id)
+
+
+def _student_meta_for_college(college) -> dict:
+    """
+    Distinct branches / years of study / semesters for one college, collected
+    and sorted by a single aggregation instead of three distinct() scans. Results are cached
+    per college for a few minutes (see utils/cache.py).
+    """
+    meta = get_student_meta(college)
+    if meta is not None:
+        return meta
+
+    def _sorted_values(field):
+        # nulls dropped, values sorted server-side (requires MongoDB 5.2+)
+        return {"$sortArray": {
+            "input": {"$filter": {"input": field, "cond": {"$ne": ["$$this", None]}}},
+            "sortBy": 1,
+        }}
+
+    try:
+        agg = list(Student._get_collection().aggregate([
+            {"$match": {"college": college}},
+            {"$group": {
+                "_id": None,
+                "branches": {"$addToSet": "$branch"},
+                "years": {"$addToSet": "$year_of_study"},
+                "sems": {"$addToSet": "$semester"},
+            }},
+            {"$project": {
+                "branches": _sorted_values("$branches"),
+                "years": _sorted_values("$years"),
+                "sems": _sorted_values("$sems"),
+            }},
+        ]))
+    except Exception:
+        app.logger.exception("Error collecting student meta for college %s", college)
+        agg = []
+
+    row = agg[0] if agg else {}
+    available_branches = row.get("branches") or []
+    available_years = row.get("years") or []
+    available_semesters = row.get("sems") or []
+
+    meta = {
+        "available_branches": available_branches,
+        "available_years_of_study": available_years,
+        "available_semesters": available_semesters
+    }
+    if agg:
+        set_student_meta(college, meta)
+    return meta
+
+
 @assign_bp.route("/bulk_assign", methods=["POST"])
 @token_required
 def bulk_assign():
@@ -46,7 +197,11 @@ def bulk_assign():
 
     Response: summary with created/skipped/errors per student_id
     """
-    data = request.get_json(force=True, silent=True)
+    if request.content_length and request.content_length > _MAX_BULK_BODY:
+        return response(False, "Request body too large"), 413
+    if request.mimetype != "application/json":
+        return response(False, "Content-Type must be application/json"), 400
+    data = request.get_json(silent=True)
     if not data:
         return response(False, "Invalid or missing JSON body"), 400
 
@@ -59,76 +214,95 @@ def bulk_assign():
         return response(False, "Missing required field: student_ids"), 400
     if not isinstance(student_ids, (list, tuple)):
         return response(False, "student_ids must be a list"), 400
+    if len(student_ids) > _MAX_BULK_IDS:
+        return response(False, f"Too many student_ids (max {_MAX_BULK_IDS})"), 413
 
-    # normalize ids to strings
-    student_ids = [str(s).strip() for s in student_ids if str(s).strip()]
+    # normalize ids to strings, dropping blanks and duplicates (order preserved)
+    student_ids = list(dict.fromkeys(s for s in (str(x).strip() for x in student_ids) if s))
 
     # Validate test exists
     try:
-        # Try ObjectId then fallback to string id
-        try:
-            test_obj = Test.objects.get(id=ObjectId(test_id))
-        except Exception:
-            test_obj = Test.objects.get(id=str(test_id))
+        tid = _ensure_test_exists(test_id)
     except DoesNotExist:
         return response(False, f"Test not found for id: {test_id}"), 404
     except Exception as e:
         app.logger.exception("Error fetching Test")
         return response(False, f"Error validating test id: {str(e)}"), 400
 
-    # Validate which students actually exist (optional, but helpful)
-    found_students = set()
-    try:
-        students_qs = Student.objects(id__in=student_ids).only("id")
-        found_students = {str(s.id) for s in students_qs}
-    except Exception:
-        # If Student model uses non-ObjectId keys or errors, fall back to checking one-by-one below.
-        found_students = set()
+    college_id = (getattr(request, "admin", {}) or {}).get("college_id")
+    if not college_id:
+        return response(False, "Admin college_id not found in token payload"), 403
 
-    results = []
-    created_count = 0
-    skipped_count = 0
-    error_count = 0
+    # malformed ids are rejected here and never sent to Mongo
+    valid_ids = [sid for sid in student_ids if ObjectId.is_valid(sid)]
+    invalid_ids = [sid for sid in student_ids if not ObjectId.is_valid(sid)]
 
-    for sid in student_ids:
-        # If we validated students and this one wasn't found, mark error and continue
-        if found_students and sid not in found_students:
-            results.append({"student_id": sid, "status": "error", "reason": "student_not_found"})
-            error_count += 1
-            continue
+    # Validate which students exist *in the admin's college*; ids only, no Documents
+    found = Student._get_collection().distinct(
+        "_id", {"_id": {"$in": [ObjectId(sid) for sid in valid_ids]}, "college": _college_filter(college_id)}
+    ) if valid_ids else []
+    found_students = {str(x) for x in found}
 
-        # Skip if already assigned
-        try:
-            already = StudentTestAttempt.objects(student_id=sid, test_id=str(test_obj.id)).first()
-        except Exception:
-            # fallback try using raw sid and test_id
-            already = StudentTestAttempt.objects(student_id=sid, test_id=test_id).first()
+    # unknown ids and students of other colleges are not assignable
+    missing = [sid for sid in valid_ids if sid not in found_students]
+    to_create = [sid for sid in valid_ids if sid in found_students]
 
-        if already:
-            results.append({"student_id": sid, "status": "skipped", "reason": "already_assigned"})
-            skipped_count += 1
+    results = (
+        [{"student_id": sid, "status": "error", "reason": "invalid_id"} for sid in invalid_ids]
+        + [{"student_id": sid, "status": "error", "reason": "student_not_found"} for sid in missing]
+    )
+    created_count = 0
+    skipped_count = 0
+    error_count = len(invalid_ids) + len(missing)
+
+    # insert-if-absent per (test_id, student_id) with $setOnInsert upserts, in
+    # fixed-size unordered batches; existing assignments are left untouched
+    created_ids = {}
+    write_errors = {}
+    coll = StudentTestAttempt._get_collection()
+    for start in range(0, len(to_create), _BATCH):
+        batch = to_create[start:start + _BATCH]
+        # one indexed read finds the already-assigned ids so they cost no write;
+        # the upsert below stays as the safety net for concurrent assigns
+        existing = set(StudentTestAttempt.objects(test_id=tid, student_id__in=batch).distinct("student_id"))
+        ops, op_index = [], []
+        for i, sid in enumerate(batch):
+            if sid in existing:
+                continue
+            op_index.append(start + i)
+            doc = StudentTestAttempt(student_id=sid, test_id=tid).to_mongo().to_dict()
+            for key in ("_id", "student_id", "test_id"):
+                doc.pop(key, None)
+            ops.append(UpdateOne({"test_id": tid, "student_id": sid}, {"$setOnInsert": doc}, upsert=True))
+        if not ops:
             continue
-
-        # create assignment
         try:
-            assign = StudentTestAttempt(student_id=sid, test_id=str(test_obj.id))
-            assign.save()
+            upserted = coll.bulk_write(ops, ordered=False).upserted_ids
+        except BulkWriteError as bwe:
+            upserted = {u["index"]: u["_id"] for u in bwe.details.get("upserted", [])}
+            for e in bwe.details.get("writeErrors", []):
+                write_errors[op_index[e["index"]]] = e
+        except Exception as e:
+            app.logger.exception("Error creating StudentTestAttempts for test %s", tid)
+            return response(False, f"Error creating assignments: {str(e)}"), 500
+        for i, _id in upserted.items():
+            created_ids[op_index[i]] = _id
+
+    for i, sid in enumerate(to_create):
+        err = write_errors.get(i)
+        if i in created_ids:
             created_count += 1
-            results.append({"student_id": sid, "status": "created", "id": str(assign.id)})
-        except NotUniqueError:
-            # concurrent create may cause duplicates; treat as skipped
+            results.append({"student_id": sid, "status": "created", "id": str(created_ids[i])})
+        elif err is None or err.get("code") == 11000:
+            # matched an existing attempt (or lost a concurrent upsert race)
             skipped_count += 1
-            results.append({"student_id": sid, "status": "skipped", "reason": "not_unique"})
-        except ValidationError as ve:
-            error_count += 1
-            results.append({"student_id": sid, "status": "error", "reason": f"validation_error: {ve}"} )
-        except Exception as e:
-            app.logger.exception("Error creating StudentTestAttempt for %s", sid)
+            results.append({"student_id": sid, "status": "skipped", "reason": "already_assigned"})
+        else:
             error_count += 1
-            results.append({"student_id": sid, "status": "error", "reason": str(e)} )
+            results.append({"student_id": sid, "status": "error", "reason": err.get("errmsg")})
 
     summary = {
-        "test_id": str(test_obj.id),
+        "test_id": tid,
         "requested": len(student_ids),
         "created": created_count,
         "skipped": skipped_count,
@@ -139,15 +313,13 @@ def bulk_assign():
     return response(True, "bulk assign complete", summary), 200
 
 
-from flask import Blueprint, request, current_app as app
-from mongoengine.errors import ValidationError, DoesNotExist
-from bson import ObjectId, errors as bson_errors
 @assign_bp.route("/students/academic", methods=["GET"])
 @token_required
 def fetch_academic_students():
     """
     Query params:
-      - search: string (matches name, usn, email, case-insensitive, partial)
+      - search: string; a single token is matched as a case-insensitive prefix of
+                name, usn or email, several words use the Student text index
       - semester: int or comma-separated ints
       - year_of_study: int or comma-separated ints
       - branch: string or comma-separated strings
@@ -155,12 +327,15 @@ def fetch_academic_students():
       - per_page: int (default 20)
       - sort_by: one of ('name','usn','year_of_study','semester','cgpa') default 'name'
       - sort_dir: 'asc' or 'desc' default 'asc'
+      - after: optional cursor (pagination.next_cursor of the previous page); when given,
+               `page` is ignored and total/total_pages are not computed
+      - include_total: '1' to compute total/total_pages (default off; use has_more instead)
 
     Only students from the admin's college (from request.admin['college_id']) are returned.
     Response contains:
       - items: list of academic objects (see below)
       - meta: distinct available_branches, available_years_of_study, available_semesters (for that college)
-      - pagination: page, per_page, total, total_pages
+      - pagination: page, per_page, total, total_pages, has_more, next_cursor
     """
     # helper to get college id from admin payload
     def _get_admin_college_id():
@@ -179,6 +354,9 @@ def fetch_academic_students():
         sort_by = request.args.get("sort_by", "name")
         sort_dir = request.args.get("sort_dir", "asc").lower()
         sort_dir_prefix = "" if sort_dir == "asc" else "-"
+        after = request.args.get("after")
+        cursor = _decode_cursor(after) if after else None
+        include_total = request.args.get("include_total", "0") == "1"
 
     except Exception as e:
         return response(False, f"Invalid query parameters: {str(e)}"), 400
@@ -188,28 +366,19 @@ def fetch_academic_students():
     if not college_id:
         return response(False, "Admin college_id not found in token payload"), 403
 
-    query_filters = {}
-    # try ObjectId or string for college reference
-    try:
-        query_filters["college"] = ObjectId(college_id)
-    except (bson_errors.InvalidId, TypeError):
-        # fallback to string id
-        query_filters["college"] = str(college_id)
+    query_filters = {"college": _college_filter(college_id)}
 
-    # search: partial match on name, usn, email (case-insensitive)
-    from mongoengine.queryset.visitor import Q
+    # search: prefix match on name, usn, email (case-insensitive) or text search
     q_obj = Q(**query_filters)
+    text_search = None
     if q_search:
-        regex = r".*{}.*".format(q_search.replace(".", r"\."))
-        q_obj &= (Q(name__icontains=q_search) | Q(usn__icontains=q_search) | Q(email__icontains=q_search))
+        prefix_q = prefix_search_filter(q_search)
+        if prefix_q is not None:
+            q_obj &= prefix_q
+        else:
+            text_search = q_search
 
     # filters: semester/year/branch (accept comma separated)
-    def _split_vals(val):
-        if val is None:
-            return None
-        parts = [v.strip() for v in str(val).split(",") if v.strip() != ""]
-        return parts or None
-
     sem_vals = _split_vals(q_sem)
     if sem_vals:
         # convert to int if possible
@@ -232,85 +401,49 @@ def fetch_academic_students():
         q_obj &= Q(branch__in=branch_vals)
 
     # determine sort field mapping to valid model fields
-    allowed_sorts = {"name", "usn", "year_of_study", "semester", "cgpa"}
-    if sort_by not in allowed_sorts:
+    if sort_by not in _ALLOWED_SORTS:
         sort_by = "name"
 
     try:
-        # total count for pagination
-        total = Student.objects(q_obj).count()
-
-        # pagination calculation
-        skip = (page - 1) * per_page
-
-        # fetch only academic fields to minimize payload
-        students_qs = Student.objects(q_obj).only(
-            "usn", "enrollment_number", "branch", "year_of_study",
-            "semester", "cgpa", "college", "name", "email"
-        ).order_by(f"{sort_dir_prefix}{sort_by}").skip(skip).limit(per_page)
-
-        items = []
-        for s in students_qs:
-            # construct minimal academic dict
-            items.append({
-                "id": str(s.id),
-                "name": s.name,
-                "email": s.email,
-                "usn": s.usn,
-                "enrollment_number": s.enrollment_number,
-                "branch": s.branch,
-                "year_of_study": s.year_of_study,
-                "semester": s.semester,
-                "cgpa": s.cgpa,
-                "college": str(s.college.id) if s.college else None
-            })
-
-        # meta: distinct values but only within this admin's college (and applied filters? user wanted distinct ones — we'll return distincts for the college scope, not further filtered subset)
-        # Use the same college filter to fetch distincts
-        distinct_base_filter = query_filters  # already filtered for college
-        try:
-            # Student.objects.distinct accepts field name; to scope by college, we filter first
-            available_branches = Student.objects(**distinct_base_filter).distinct("branch") or []
-            available_years = Student.objects(**distinct_base_filter).distinct("year_of_study") or []
-            available_semesters = Student.objects(**distinct_base_filter).distinct("semester") or []
-        except Exception:
-            # fallback: try using string college id
-            try:
-                distinct_base_filter_alt = {"college": str(college_id)}
-                available_branches = Student.objects(**distinct_base_filter_alt).distinct("branch") or []
-                available_years = Student.objects(**distinct_base_filter_alt).distinct("year_of_study") or []
-                available_semesters = Student.objects(**distinct_base_filter_alt).distinct("semester") or []
-            except Exception:
-                available_branches, available_years, available_semesters = [], [], []
-
-        # sort distinct lists (years/semesters numerically, branches alphabetically)
-        try:
-            available_years = sorted([int(x) for x in available_years])
-        except Exception:
-            # if values are mixed or non-int, sort by natural order
-            available_years = sorted(available_years)
+        # fetch only academic fields to minimize payload, as raw dicts;
+        # _id breaks ties so the keyset cursor is stable
+        base_qs = Student.objects.search_text(text_search) if text_search else Student.objects
+        students_qs = base_qs.only(*_ACADEMIC_FIELDS).order_by(f"{sort_dir_prefix}{sort_by}", f"{sort_dir_prefix}id")
+        if not text_search:
+            # pin the (college, sort field, _id) index so large pages walk it instead of sorting in memory
+            students_qs = students_qs.hint([("college", 1), (sort_by, 1), ("_id", 1)])
+
+        if cursor:
+            students_qs = students_qs.filter(q_obj & _keyset_filter(sort_by, sort_dir_prefix == "-", *cursor))
+        else:
+            # pagination calculation
+            skip = (page - 1) * per_page
+            students_qs = students_qs.filter(q_obj).skip(skip)
 
-        try:
-            available_semesters = sorted([int(x) for x in available_semesters])
-        except Exception:
-            available_semesters = sorted(available_semesters)
+        # one extra row tells us whether another page exists without counting
+        rows = list(students_qs.limit(per_page + 1).as_pymongo())
+        has_more = len(rows) > per_page
+        items = [student_academic_to_json(s) for s in rows[:per_page]]
+
+        # total count is opt-in and never computed for cursor requests
+        total = base_qs.filter(q_obj).count() if include_total and not cursor else None
 
-        available_branches = sorted([b for b in available_branches if b is not None])
+        # meta: distinct values for the college scope, not further filtered subset
+        meta = _student_meta_for_college(query_filters["college"])
 
-        total_pages = (total + per_page - 1) // per_page if per_page else 1
+        total_pages = (total + per_page - 1) // per_page if per_page and total is not None else None
+        next_cursor = _encode_cursor(items[-1][sort_by], items[-1]["id"]) if has_more else None
 
         payload = {
             "items": items,
-            "meta": {
-                "available_branches": available_branches,
-                "available_years_of_study": available_years,
-                "available_semesters": available_semesters
-            },
+            "meta": meta,
             "pagination": {
-                "page": page,
+                "page": None if cursor else page,
                 "per_page": per_page,
                 "total": total,
-                "total_pages": total_pages
+                "total_pages": total_pages,
+                "has_more": has_more,
+                "next_cursor": next_cursor
             }
         }
 
@@ -324,9 +457,6 @@ def fetch_academic_students():
     
 # --- Add these routes to routes/assignments.py ---
 
-from bson import ObjectId, errors as bson_errors
-from mongoengine.errors import DoesNotExist
-
 # GET assigned students for a test (with same filtering / pagination / sorting as fetch_academic_students)
 @assign_bp.route("/students/assigned", methods=["GET"])
 @token_required
@@ -335,7 +465,7 @@ def fetch_assigned_students():
     Query params (same semantics as fetch_academic_students):
       - test_id: required
       - search, semester, year_of_study, branch
-      - page, per_page, sort_by, sort_dir
+      - page, per_page, sort_by, sort_dir, after, include_total
     Returns students who already have a StudentTestAttempt for that test (scoped to admin's college).
     """
     # helper to get college id from admin payload
@@ -358,15 +488,15 @@ def fetch_assigned_students():
         sort_by = request.args.get("sort_by", "name")
         sort_dir = request.args.get("sort_dir", "asc").lower()
         sort_dir_prefix = "" if sort_dir == "asc" else "-"
+        after = request.args.get("after")
+        cursor = _decode_cursor(after) if after else None
+        include_total = request.args.get("include_total", "0") == "1"
     except Exception as e:
         return response(False, f"Invalid query parameters: {str(e)}"), 400
 
     # validate test exists
     try:
-        try:
-            test_obj = Test.objects.get(id=ObjectId(test_id))
-        except Exception:
-            test_obj = Test.objects.get(id=str(test_id))
+        tid = _ensure_test_exists(test_id)
     except DoesNotExist:
         return response(False, f"Test not found for id: {test_id}"), 404
     except Exception as e:
@@ -377,48 +507,18 @@ def fetch_assigned_students():
     if not college_id:
         return response(False, "Admin college_id not found in token payload"), 403
 
-    # get all assigned student ids for the test
-    try:
-        assigned_qs = StudentTestAttempt.objects(test_id=str(test_obj.id)).only("student_id")
-        assigned_student_ids = {str(a.student_id) for a in assigned_qs if getattr(a, "student_id", None) is not None}
-    except Exception:
-        # fallback: try raw test_id
-        try:
-            assigned_qs = StudentTestAttempt.objects(test_id=test_id).only("student_id")
-            assigned_student_ids = {str(a.student_id) for a in assigned_qs if getattr(a, "student_id", None) is not None}
-        except Exception as e:
-            app.logger.exception("Error fetching assigned attempts")
-            return response(False, f"Error fetching assigned students: {str(e)}"), 500
+    # build student query: only students of admin's college (assignment is joined in below)
+    query_filters = {"college": _college_filter(college_id)}
 
-    if not assigned_student_ids:
-        # still return paginated empty payload (so frontends get meta)
-        payload = {
-            "items": [],
-            "meta": {"available_branches": [], "available_years_of_study": [], "available_semesters": []},
-            "pagination": {"page": page, "per_page": per_page, "total": 0, "total_pages": 0}
-        }
-        return response(True, "no assigned students found", payload), 200
-
-    # build base query: only students of admin's college AND whose id is in assigned_student_ids
-    from mongoengine.queryset.visitor import Q
-    query_filters = {}
-    try:
-        query_filters["college"] = ObjectId(college_id)
-    except (bson_errors.InvalidId, TypeError):
-        query_filters["college"] = str(college_id)
-
-    q_obj = Q(**query_filters) & Q(id__in=list(assigned_student_ids))
+    q_obj = Q(**query_filters)
 
     # apply search filter
+    # $text cannot run inside the $lookup below, so multi-word searches keep the substring match
     if q_search:
-        q_obj &= (Q(name__icontains=q_search) | Q(usn__icontains=q_search) | Q(email__icontains=q_search))
-
-    # helper to split comma separated values
-    def _split_vals(val):
-        if val is None:
-            return None
-        parts = [v.strip() for v in str(val).split(",") if v.strip() != ""]
-        return parts or None
+        prefix_q = prefix_search_filter(q_search)
+        if prefix_q is None:
+            prefix_q = Q(name__icontains=q_search) | Q(usn__icontains=q_search) | Q(email__icontains=q_search)
+        q_obj &= prefix_q
 
     sem_vals = _split_vals(q_sem)
     if sem_vals:
@@ -440,68 +540,68 @@ def fetch_assigned_students():
     if branch_vals:
         q_obj &= Q(branch__in=branch_vals)
 
-    allowed_sorts = {"name", "usn", "year_of_study", "semester", "cgpa"}
-    if sort_by not in allowed_sorts:
+    if sort_by not in _ALLOWED_SORTS:
         sort_by = "name"
 
     try:
-        total = Student.objects(q_obj).count()
-        skip = (page - 1) * per_page
-        students_qs = Student.objects(q_obj).only(
-            "usn", "enrollment_number", "branch", "year_of_study",
-            "semester", "cgpa", "college", "name", "email"
-        ).order_by(f"{sort_dir_prefix}{sort_by}").skip(skip).limit(per_page)
-
-        items = []
-        for s in students_qs:
-            items.append({
-                "id": str(s.id),
-                "name": s.name,
-                "email": s.email,
-                "usn": s.usn,
-                "enrollment_number": s.enrollment_number,
-                "branch": s.branch,
-                "year_of_study": s.year_of_study,
-                "semester": s.semester,
-                "cgpa": s.cgpa,
-                "college": str(s.college.id) if s.college else None
-            })
+        student_q = q_obj & _keyset_filter(sort_by, sort_dir_prefix == "-", *cursor) if cursor else q_obj
+        direction = -1 if sort_dir_prefix == "-" else 1
+
+        # one extra row tells us whether another page exists without counting
+        page_stages = [] if cursor else [{"$skip": (page - 1) * per_page}]
+        page_stages.append({"$limit": per_page + 1})
+        facet = {"page": page_stages}
+        # total count is opt-in and never computed for cursor requests
+        if include_total and not cursor:
+            facet["total"] = [{"$count": "n"}]
+
+        # join the test's attempts to their students server-side, so the assigned
+        # id set never travels to the app and back as a huge $in list
+        pipeline = [
+            {"$match": {"test_id": tid}},
+            {"$group": {"_id": "$student_id"}},
+            {"$lookup": {
+                "from": Student._get_collection_name(),
+                "let": {"sid": {"$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$sid"]}}},
+                    {"$match": Student.objects(student_q)._query},
+                    {"$project": {f: 1 for f in _ACADEMIC_FIELDS}},
+                ],
+                "as": "s",
+            }},
+            {"$unwind": "$s"},
+            {"$replaceRoot": {"newRoot": "$s"}},
+            {"$sort": {sort_by: direction, "_id": direction}},
+            {"$facet": facet},
+        ]
+        agg = next(StudentTestAttempt._get_collection().aggregate(pipeline), {})
+
+        rows = agg.get("page") or []
+        has_more = len(rows) > per_page
+        items = [student_academic_to_json(s) for s in rows[:per_page]]
+
+        total = None
+        if "total" in facet:
+            total = agg["total"][0]["n"] if agg.get("total") else 0
 
         # meta: distincts within admin's college (same approach as fetch_academic_students)
-        distinct_base_filter = query_filters
-        try:
-            available_branches = Student.objects(**distinct_base_filter).distinct("branch") or []
-            available_years = Student.objects(**distinct_base_filter).distinct("year_of_study") or []
-            available_semesters = Student.objects(**distinct_base_filter).distinct("semester") or []
-        except Exception:
-            try:
-                distinct_base_filter_alt = {"college": str(college_id)}
-                available_branches = Student.objects(**distinct_base_filter_alt).distinct("branch") or []
-                available_years = Student.objects(**distinct_base_filter_alt).distinct("year_of_study") or []
-                available_semesters = Student.objects(**distinct_base_filter_alt).distinct("semester") or []
-            except Exception:
-                available_branches, available_years, available_semesters = [], [], []
+        meta = _student_meta_for_college(query_filters["college"])
 
-        try:
-            available_years = sorted([int(x) for x in available_years])
-        except Exception:
-            available_years = sorted(available_years)
-        try:
-            available_semesters = sorted([int(x) for x in available_semesters])
-        except Exception:
-            available_semesters = sorted(available_semesters)
-        available_branches = sorted([b for b in available_branches if b is not None])
-
-        total_pages = (total + per_page - 1) // per_page if per_page else 1
+        total_pages = (total + per_page - 1) // per_page if per_page and total is not None else None
+        next_cursor = _encode_cursor(items[-1][sort_by], items[-1]["id"]) if has_more else None
 
         payload = {
             "items": items,
-            "meta": {
-                "available_branches": available_branches,
-                "available_years_of_study": available_years,
-                "available_semesters": available_semesters
-            },
-            "pagination": {"page": page, "per_page": per_page, "total": total, "total_pages": total_pages}
+            "meta": meta,
+            "pagination": {
+                "page": None if cursor else page,
+                "per_page": per_page,
+                "total": total,
+                "total_pages": total_pages,
+                "has_more": has_more,
+                "next_cursor": next_cursor
+            }
         }
         return response(True, "assigned students fetched", payload), 200
 
@@ -523,7 +623,11 @@ def bulk_unassign():
 
     Response: summary with removed/skipped/errors per student_id
     """
-    data = request.get_json(force=True, silent=True)
+    if request.content_length and request.content_length > _MAX_BULK_BODY:
+        return response(False, "Request body too large"), 413
+    if request.mimetype != "application/json":
+        return response(False, "Content-Type must be application/json"), 400
+    data = request.get_json(silent=True)
     if not data:
         return response(False, "Invalid or missing JSON body"), 400
 
@@ -536,49 +640,46 @@ def bulk_unassign():
         return response(False, "Missing required field: student_ids"), 400
     if not isinstance(student_ids, (list, tuple)):
         return response(False, "student_ids must be a list"), 400
+    if len(student_ids) > _MAX_BULK_IDS:
+        return response(False, f"Too many student_ids (max {_MAX_BULK_IDS})"), 413
 
-    student_ids = [str(s).strip() for s in student_ids if str(s).strip()]
+    student_ids = list(dict.fromkeys(s for s in (str(x).strip() for x in student_ids) if s))
 
     # Validate test exists
     try:
-        try:
-            test_obj = Test.objects.get(id=ObjectId(test_id))
-        except Exception:
-            test_obj = Test.objects.get(id=str(test_id))
+        tid = _ensure_test_exists(test_id)
     except DoesNotExist:
         return response(False, f"Test not found for id: {test_id}"), 404
     except Exception as e:
         app.logger.exception("Error fetching Test")
         return response(False, f"Error validating test id: {str(e)}"), 400
 
+    # per batch: one query to learn which of the ids are assigned, one delete for all of them
+    assigned = set()
+    try:
+        for start in range(0, len(student_ids), _BATCH):
+            batch = student_ids[start:start + _BATCH]
+            assigned.update(StudentTestAttempt.objects(test_id=tid, student_id__in=batch).distinct("student_id"))
+            StudentTestAttempt._get_collection().delete_many({"test_id": tid, "student_id": {"$in": batch}})
+    except Exception as e:
+        app.logger.exception("Error deleting attempts for test %s", tid)
+        return response(False, f"Error removing assignments: {str(e)}"), 500
+
     results = []
     removed_count = 0
     skipped_count = 0
     error_count = 0
 
     for sid in student_ids:
-        try:
-            # try delete by normalized test id
-            deleted = StudentTestAttempt.objects(student_id=sid, test_id=str(test_obj.id)).delete()
-        except Exception:
-            # fallback try using raw test_id
-            try:
-                deleted = StudentTestAttempt.objects(student_id=sid, test_id=test_id).delete()
-            except Exception as e:
-                app.logger.exception("Error deleting attempt for %s", sid)
-                error_count += 1
-                results.append({"student_id": sid, "status": "error", "reason": str(e)})
-                continue
-
-        if deleted and deleted > 0:
+        if sid in assigned:
             removed_count += 1
-            results.append({"student_id": sid, "status": "removed", "deleted_count": deleted})
+            results.append({"student_id": sid, "status": "removed"})
         else:
             skipped_count += 1
             results.append({"student_id": sid, "status": "skipped", "reason": "not_assigned"})
 
     summary = {
-        "test_id": str(test_obj.id),
+        "test_id": tid,
         "requested": len(student_ids),
         "removed": removed_count,
         "skipped": skipped_count,
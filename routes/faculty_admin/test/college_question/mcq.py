@@ -1,12 +1,14 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app as app
 from math import ceil
+from bson import ObjectId
 from mongoengine.errors import ValidationError, DoesNotExist
 
 from utils.response import response
+from utils.cache import get_question_facets, set_question_facets
 # reuse token_required from your other routes (adjust import path if needed)
 # from routes.f.test.tests import token_required
 from routes.faculty_admin.test.tests import token_required
-from models.questions.mcq import CollegeMCQ as MCQ, MCQConfig
+from models.questions.mcq import CollegeMCQ as MCQ
 
 mcq_bp = Blueprint("collge_mcq", __name__, url_prefix="/test/college-questions/mcqs")
 
@@ -16,13 +18,11 @@ def mcq_minimal_to_json(mcq: MCQ) -> dict:
     Minimal representation used by list endpoints.
     NOTE: images are intentionally excluded from this minimal view.
     """
-    options_json = []
-    for o in mcq.options or []:
-        options_json.append({
-            "id": o.option_id,
-            "text": o.value,
-            "is_correct": o.option_id in (mcq.correct_options or [])
-        })
+    correct_set = set(mcq.correct_options or ())
+    options_json = [
+        {"id": o.option_id, "text": o.value, "is_correct": o.option_id in correct_set}
+        for o in mcq.options or []
+    ]
 
     created_by = mcq.created_by or {}
     created_by_min = {
@@ -47,22 +47,77 @@ def mcq_minimal_to_json(mcq: MCQ) -> dict:
     }
 
 
+_MCQ_LIST_FIELDS = (
+    "title", "question_text", "difficulty_level", "topic", "subtopic", "tags", "marks",
+    "negative_marks", "time_limit", "is_multiple", "options", "correct_options", "created_by",
+)
+
+
+def _mcq_facets() -> dict:
+    """
+    Filter dropdown values (topics/subtopics/tags/difficulty_levels) for the list
+    endpoint, read live with distinct() so deletes and edits drop stale values.
+    The four scans run at most once per minute (see utils/cache.py).
+    Not read from MCQConfig: it only grows through $addToSet, so it keeps values
+    of deleted/renamed MCQs and misses those written before it was maintained.
+    """
+    name = MCQ._get_collection_name()
+    facets = get_question_facets(name)
+    if facets is None:
+        facets = {
+            "topics": sorted(filter(None, MCQ.objects.distinct("topic") or [])),
+            "subtopics": sorted(filter(None, MCQ.objects.distinct("subtopic") or [])),
+            "tags": sorted(filter(None, MCQ.objects.distinct("tags") or [])),
+            "difficulty_levels": sorted(filter(None, MCQ.objects.distinct("difficulty_level") or [])),
+        }
+        set_question_facets(name, facets)
+    return facets
+
+
+def _mcq_raw_to_json(d: dict) -> dict:
+    """
+    Same shape as mcq_minimal_to_json, built from a raw (as_pymongo) document.
+    """
+    correct = set(d.get("correct_options") or [])
+    created_by = d.get("created_by") or {}
+    return {
+        "id": str(d["_id"]),
+        "title": d.get("title"),
+        "question": d.get("question_text"),
+        "difficulty_level": d.get("difficulty_level"),
+        "topic": d.get("topic"),
+        "subtopic": d.get("subtopic"),
+        "tags": d.get("tags") or [],
+        "marks": d.get("marks"),
+        "negative_marks": d.get("negative_marks"),
+        "time_limit": d.get("time_limit"),
+        "is_multiple": bool(d.get("is_multiple")),
+        "options": [
+            {"id": o.get("option_id"), "text": o.get("value"), "is_correct": o.get("option_id") in correct}
+            for o in d.get("options") or []
+        ],  # images omitted intentionally
+        "created_by": {"id": created_by.get("id"), "name": created_by.get("name")} if created_by else {},
+    }
+
+
 @mcq_bp.route("/", methods=["GET"])
 @token_required
 def list_mcqs():
-    print('yes')
     """
     GET /mcqs
     Query params:
       - page (int, default 1)
+      - after_id (optional; with the default newest-first sort, return items older than this id
+        instead of skipping to `page`; pass meta.next_after_id from the previous page)
       - per_page (int, default 20)
       - tags (comma separated, matches ANY tag)
       - topic (exact match)
       - subtopic (exact match)
       - difficulty_level (exact match: Easy|Medium|Hard)
-      - search (optional text search against title/question_text)
+      - search (optional text search against title/question_text, uses the text index)
       - sort_by (optional field name, default: created at / id)
       - sort_dir (asc|desc, default desc)
+      - include_total ('1' to count filtered results; default off, use has_next instead)
 
     Response:
       {
@@ -71,10 +126,12 @@ def list_mcqs():
         data: {
           items: [... minimal mcq ...],
           meta: {
-            total: int,
+            total: int | null (always set when no filter/search is applied),
             page: int,
             per_page: int,
-            total_pages: int,
+            total_pages: int | null,
+            has_next: bool,
+            next_after_id: str | null,
             topics: [...],
             subtopics: [...],
             tags: [...],
@@ -109,6 +166,12 @@ def list_mcqs():
 
     search = params.get("search", "").strip()
 
+    include_total = params.get("include_total", "0") == "1"
+
+    after_id = params.get("after_id")
+    if after_id and not ObjectId.is_valid(after_id):
+        return response(False, "Invalid after_id"), 400
+
     # sort
     sort_by = params.get("sort_by", None)  # e.g., "marks" or "difficulty_level"
     sort_dir = params.get("sort_dir", "desc").lower()
@@ -130,13 +193,17 @@ def list_mcqs():
         # base queryset
         qs = MCQ.objects(**query)
 
-        # basic search (title or question_text) - case-insensitive contains
+        # search (title or question_text) goes through the CollegeMCQ text index
         if search:
-            # MongoEngine Q for OR
-            from mongoengine.queryset.visitor import Q as MQ
-            qs = qs.filter(MQ(title__icontains=search) | MQ(question_text__icontains=search))
+            qs = qs.search_text(search)
 
-        total = qs.count()
+        if not (query or search):
+            # unfiltered: collection metadata count, no scan
+            total = MCQ._get_collection().estimated_document_count()
+        elif include_total:
+            total = qs.count()
+        else:
+            total = None
 
         # sorting: default by id (descending)
         if sort_by:
@@ -150,47 +217,38 @@ def list_mcqs():
         else:
             ordering = "-id"  # newest first by default
 
-        qs = qs.order_by(ordering)
+        qs = qs.order_by(ordering).only(*_MCQ_LIST_FIELDS).as_pymongo()
 
-        # pagination slicing (mongoengine supports skip/limit via [start:end])
-        start = (page - 1) * per_page
-        end = start + per_page
-        items = list(qs[start:end])
+        if after_id and ordering == "-id":
+            # range on _id: cost no longer grows with the page number
+            items = list(qs.filter(id__lt=ObjectId(after_id)).limit(per_page + 1))
+        else:
+            # pagination slicing (mongoengine supports skip/limit via [start:end])
+            start = (page - 1) * per_page
+            end = start + per_page + 1  # one extra row tells us whether a next page exists
+            if start > 1000:
+                app.logger.warning("list_mcqs: deep skip (%d); clients should page with after_id", start)
+            items = list(qs[start:end])
 
-        total_pages = ceil(total / per_page) if per_page else 1
+        has_next = len(items) > per_page
+        items = items[:per_page]
 
-        items_json = [m.to_json() for m in items]
+        total_pages = ceil(total / per_page) if total is not None else None
+
+        items_json = [_mcq_raw_to_json(d) for d in items]
 
-        # meta: try to use MCQConfig document if available for canonical lists
-        config = None
-        try:
-            config = MCQConfig.objects(collection_name="mcqs").first()
-        except Exception:
-            # fall back to first config if a query fails for some reason
-            config = MCQConfig.objects.first()
-
-       
-            # fallback: aggregate from MCQ collection
-            # NOTE: these queries are simple and may be slow on large collections;
-            # consider maintaining MCQConfig or indexes for production.
-        topics = MCQ.objects.distinct("topic") or []
-        subtopics = MCQ.objects.distinct("subtopic") or []
-        tags_list = MCQ.objects.distinct("tags") or []
-        difficulty_levels = MCQ.objects.distinct("difficulty_level") or []
-        # print(page)
         meta = {
             "total": total,
             "page": page,
             "per_page": per_page,
             "total_pages": total_pages,
-            "topics": sorted([t for t in topics if t]),
-            "subtopics": sorted([s for s in subtopics if s]),
-            "tags": sorted([t for t in tags_list if t]),
-            "difficulty_levels": sorted([d for d in difficulty_levels if d]),
+            "has_next": has_next,
+            "next_after_id": str(items[-1]["_id"]) if has_next else None,
+            **_mcq_facets(),
         }
 
         data = {"items": items_json, "meta": meta}
-        print(len(data["items"]))
+        app.logger.debug("list_mcqs returned %d items", len(items_json))
         return response(True, "MCQs fetched", data), 200
 
     except ValidationError as e:
@@ -206,8 +264,73 @@ from flask import jsonify
 from mongoengine.errors import DoesNotExist
 
 # import classes needed for duplication
-from models.questions.mcq import CollegeMCQ as MCQ, MCQConfig, TestMCQ, Option, Image  # Option/Image are embedded docs
+from models.questions.mcq import CollegeMCQ as MCQ, TestMCQ, Option, Image, update_mcq_config  # Option/Image are embedded docs
 from models.test.section import Section, SectionQuestion
+from mongoengine import get_db
+
+
+def _copy_to_test_mcq(original) -> TestMCQ:
+    """
+    Unsaved TestMCQ copy of a college MCQ: options/images are re-created with new ids
+    and correct_options are remapped to the new option ids.
+    """
+    # -- duplicate images helper --
+    def dup_image(orig_img):
+        # create a new Image embedded document (new image_id will be generated by default)
+        return Image(
+            label=getattr(orig_img, "label", None),
+            url=getattr(orig_img, "url", None),
+            alt_text=getattr(orig_img, "alt_text", None),
+            metadata=getattr(orig_img, "metadata", None) or {}
+        )
+
+    # -- duplicate options and keep mapping for correct options --
+    new_options = []
+    old_to_new_option_id = {}
+    for orig_opt in (original.options or []):
+        # create a new Option (option_id will be autogenerated if not specified)
+        # copy images (create new Image embedded docs)
+        copied_images = [dup_image(img) for img in (orig_opt.images or [])]
+        new_opt = Option(value=orig_opt.value, images=copied_images)
+        # new_opt.option_id will be populated by default factory when saved/serialized
+        # but to access it right away we ensure it has an id attribute (mongoengine EmbeddedDocument allows this)
+        new_options.append(new_opt)
+        # store mapping from old to new - new_opt.option_id should exist because Default lambda sets it on creation
+        old_to_new_option_id[orig_opt.option_id] = new_opt.option_id
+
+    # remap correct_options to new option ids
+    new_correct_options = []
+    for old_id in (original.correct_options or []):
+        new_id = old_to_new_option_id.get(old_id)
+        # if mapping not found (weird), skip it
+        if new_id:
+            new_correct_options.append(new_id)
+
+    # duplicate question-level images & explanation images
+    new_question_images = [dup_image(i) for i in (original.question_images or [])]
+    new_explanation_images = [dup_image(i) for i in (original.explanation_images or [])]
+
+    # create TestMCQ with copied fields
+    return TestMCQ(
+        title=original.title,
+        question_text=original.question_text,
+        question_images=new_question_images,
+        options=new_options,
+        correct_options=new_correct_options,
+        is_multiple=original.is_multiple,
+        marks=original.marks,
+        negative_marks=original.negative_marks,
+        difficulty_level=original.difficulty_level,
+        explanation=original.explanation,
+        explanation_images=new_explanation_images,
+        tags=list(original.tags or []),
+        time_limit=original.time_limit,
+        topic=original.topic,
+        subtopic=original.subtopic,
+        # for created_by: you may want to set this to the current user; preserve for now
+        created_by=getattr(original, "created_by", {"id": "system", "name": "System"}),
+    )
+
 
 # new endpoint: duplicate mcq into test_mcqs and attach to section
 @mcq_bp.route("/<string:mcq_id>/duplicate-to-section", methods=["POST"])
@@ -235,83 +358,39 @@ def duplicate_mcq_to_section(mcq_id):
         # load original MCQ
         original = MCQ.objects.get(id=mcq_id)
 
-        # -- duplicate images helper --
-        def dup_image(orig_img):
-            # create a new Image embedded document (new image_id will be generated by default)
-            return Image(
-                label=getattr(orig_img, "label", None),
-                url=getattr(orig_img, "url", None),
-                alt_text=getattr(orig_img, "alt_text", None),
-                metadata=getattr(orig_img, "metadata", None) or {}
-            )
-
-        # -- duplicate options and keep mapping for correct options --
-        new_options = []
-        old_to_new_option_id = {}
-        for orig_opt in (original.options or []):
-            # create a new Option (option_id will be autogenerated if not specified)
-            # copy images (create new Image embedded docs)
-            copied_images = [dup_image(img) for img in (orig_opt.images or [])]
-            new_opt = Option(value=orig_opt.value, images=copied_images)
-            # new_opt.option_id will be populated by default factory when saved/serialized
-            # but to access it right away we ensure it has an id attribute (mongoengine EmbeddedDocument allows this)
-            new_options.append(new_opt)
-            # store mapping from old to new - new_opt.option_id should exist because Default lambda sets it on creation
-            old_to_new_option_id[orig_opt.option_id] = new_opt.option_id
-
-        # remap correct_options to new option ids
-        new_correct_options = []
-        for old_id in (original.correct_options or []):
-            new_id = old_to_new_option_id.get(old_id)
-            # if mapping not found (weird), skip it
-            if new_id:
-                new_correct_options.append(new_id)
-
-        # duplicate question-level images & explanation images
-        new_question_images = [dup_image(i) for i in (original.question_images or [])]
-        new_explanation_images = [dup_image(i) for i in (original.explanation_images or [])]
-
-        # create TestMCQ with copied fields
-        test_mcq = TestMCQ(
-            title=original.title,
-            question_text=original.question_text,
-            question_images=new_question_images,
-            options=new_options,
-            correct_options=new_correct_options,
-            is_multiple=original.is_multiple,
-            marks=original.marks,
-            negative_marks=original.negative_marks,
-            difficulty_level=original.difficulty_level,
-            explanation=original.explanation,
-            explanation_images=new_explanation_images,
-            tags=list(original.tags or []),
-            time_limit=original.time_limit,
-            topic=original.topic,
-            subtopic=original.subtopic,
-            # for created_by: you may want to set this to the current user; preserve for now
-            created_by=getattr(original, "created_by", {"id": "system", "name": "System"}),
-        )
+        test_mcq = _copy_to_test_mcq(original)
 
-        # save the duplicated test mcq
-        test_mcq.save()
-
-        # attach to section
-        try:
-            section = Section.objects.get(id=section_id)
-        except DoesNotExist:
-            # rollback the created test_mcq? For simplicity we keep it but inform client
+        if not ObjectId.is_valid(section_id):
             return response(False, f"Section not found: {section_id}"), 404
 
-        # create embedded SectionQuestion and append
-        sq = SectionQuestion(question_type="mcq", mcq_ref=test_mcq)
-        section.questions = section.questions or []
-        section.questions.append(sq)
-        section.save()
+        # insert the copy and $push it onto the section in one transaction,
+        # so a missing section never leaves an orphaned TestMCQ behind
+        test_mcq.validate()
+        client = get_db().client
+        with client.start_session() as session:
+            with session.start_transaction():
+                inserted = TestMCQ._get_collection().insert_one(test_mcq.to_mongo(), session=session)
+                test_mcq.id = inserted.inserted_id
+                sq = SectionQuestion(question_type="mcq", mcq_ref=test_mcq)
+                pushed = Section._get_collection().update_one(
+                    {"_id": ObjectId(section_id)},
+                    {"$push": {"questions": sq.to_mongo()}},
+                    session=session,
+                )
+                if pushed.matched_count == 0:
+                    session.abort_transaction()
+                    return response(False, f"Section not found: {section_id}"), 404
+
+        # same best-effort facet refresh that TestMCQ.save() would have done
+        try:
+            test_mcq._update_config_for_collection()
+        except Exception:
+            pass
 
         return response(True, "MCQ duplicated into TestMCQ and added to section", {
             "original_mcq_id": str(original.id),
             "test_mcq_id": str(test_mcq.id),
-            "section_id": str(section.id)
+            "section_id": section_id
         }), 201
 
     except DoesNotExist:
@@ -321,3 +400,90 @@ def duplicate_mcq_to_section(mcq_id):
     except Exception as e:
         # log exception in real app
         return response(False, f"Failed to duplicate MCQ: {str(e)}"), 500
+
+
+@mcq_bp.route("/bulk-duplicate-to-section", methods=["POST"])
+@token_required
+def bulk_duplicate_mcqs_to_section():
+    """
+    POST /test/college-questions/mcqs/bulk-duplicate-to-section
+    Body JSON:
+      {
+        "section_id": "<section id to attach to>",
+        "mcq_ids": ["<mcq id>", ...]
+      }
+    Behavior:
+      - Same copy as duplicate-to-section, for many MCQs at once
+      - One insert_many of the TestMCQs and one $push/$each onto the section, in a transaction
+      - Copies keep the order of mcq_ids; unknown ids are reported in not_found
+    """
+    data = request.get_json(force=True, silent=True) or {}
+    section_id = data.get("section_id")
+    mcq_ids = data.get("mcq_ids") or []
+    if not section_id:
+        return response(False, "Missing required field: section_id"), 400
+    if not isinstance(mcq_ids, list) or not mcq_ids:
+        return response(False, "mcq_ids must be a non-empty list"), 400
+    if not ObjectId.is_valid(section_id):
+        return response(False, f"Section not found: {section_id}"), 404
+
+    # dedupe, keep order, drop malformed ids
+    mcq_ids = list(dict.fromkeys(str(m).strip() for m in mcq_ids))
+    valid_ids = [m for m in mcq_ids if ObjectId.is_valid(m)]
+
+    try:
+        originals = {str(m.id): m for m in MCQ.objects(id__in=valid_ids)}
+        ordered = [originals[m] for m in mcq_ids if m in originals]
+        not_found = [m for m in mcq_ids if m not in originals]
+        if not ordered:
+            return response(False, "No MCQs found for the given mcq_ids", {"not_found": not_found}), 404
+
+        test_mcqs = [_copy_to_test_mcq(o) for o in ordered]
+        for t in test_mcqs:
+            t.validate()
+
+        client = get_db().client
+        with client.start_session() as session:
+            with session.start_transaction():
+                inserted = TestMCQ._get_collection().insert_many(
+                    [t.to_mongo() for t in test_mcqs], session=session
+                )
+                for t, _id in zip(test_mcqs, inserted.inserted_ids):
+                    t.id = _id
+                pushed = Section._get_collection().update_one(
+                    {"_id": ObjectId(section_id)},
+                    {"$push": {"questions": {"$each": [
+                        SectionQuestion(question_type="mcq", mcq_ref=t).to_mongo() for t in test_mcqs
+                    ]}}},
+                    session=session,
+                )
+                if pushed.matched_count == 0:
+                    session.abort_transaction()
+                    return response(False, f"Section not found: {section_id}"), 404
+
+        # one facet refresh for the whole batch
+        try:
+            update_mcq_config(
+                TestMCQ._get_collection_name(),
+                topics=[t.topic for t in test_mcqs],
+                subtopics=[t.subtopic for t in test_mcqs],
+                tags=[tag for t in test_mcqs for tag in (t.tags or [])],
+                difficulty_levels=[t.difficulty_level for t in test_mcqs],
+            )
+        except Exception:
+            pass
+
+        return response(True, "MCQs duplicated into TestMCQ and added to section", {
+            "section_id": section_id,
+            "duplicated": [
+                {"original_mcq_id": str(o.id), "test_mcq_id": str(t.id)}
+                for o, t in zip(ordered, test_mcqs)
+            ],
+            "not_found": not_found,
+        }), 201
+
+    except ValidationError as e:
+        return response(False, f"Validation error: {str(e)}"), 400
+    except Exception as e:
+        # log exception in real app
+        return response(False, f"Failed to duplicate MCQs: {str(e)}"), 500
@@ -1,10 +1,13 @@
 # routes/coding.py
 from flask import Blueprint, request
-from math import ceil
+from bson import ObjectId
 from mongoengine.errors import ValidationError, DoesNotExist
+from mongoengine.queryset.visitor import Q as MQ
 
 from routes.faculty_admin.test.tests import token_required
 from utils.response import response
+from utils.list_params import parse_list_params, MIN_TEXT_SEARCH
+from utils.cache import get_question_facets, set_question_facets
 
 # Adjust import paths to your project layout if necessary
 # Your provided models.py defined Question, TestQuestion, TestCaseGroup, TestCase, Submission etc.
@@ -14,42 +17,69 @@ from models.questions.coding import Question, TestQuestion, TestCaseGroup, TestC
 # from models.testcase import TestCaseGroup, TestCase
 
 from models.test.section import Section, SectionQuestion
+from mongoengine import get_db
 
 coding_bp = Blueprint("coding", __name__, url_prefix="/test/questions/coding")
 
 
+# fields read by coding_list_to_json; the list query projects only these
+_CODING_LIST_FIELDS = (
+    "title", "topic", "subtopic", "tags", "short_description", "difficulty", "points",
+    "time_limit_ms", "memory_limit_kb", "sample_io", "allowed_languages", "published",
+)
 
-def coding_minimal_to_json(q: Question) -> dict:
-    """Full representation including all CodingData fields."""
 
+def coding_list_to_json(d: dict) -> dict:
+    """
+    List-row representation from a raw (as_pymongo) document. Code bodies
+    (predefined_boilerplates, solution_code) and the long markdown description are left out.
+    """
     return {
-        "id": str(q.id),
-        "title": q.title,
-        "topic": getattr(q, "topic", "") or "",
-        "subtopic": getattr(q, "subtopic", "") or "",
-        "tags": getattr(q, "tags", []) or [],
-        "short_description": getattr(q, "short_description", "") or "",
-        "long_description_markdown": getattr(q, "long_description_markdown", "") or "",
-        "difficulty": getattr(q, "difficulty", "") or "",
-        "points": getattr(q, "points", 0),
-        "time_limit_ms": getattr(q, "time_limit_ms", 2000),
-        "memory_limit_kb": getattr(q, "memory_limit_kb", 65536),
+        "id": str(d["_id"]),
+        "title": d.get("title"),
+        "topic": d.get("topic") or "",
+        "subtopic": d.get("subtopic") or "",
+        "tags": d.get("tags") or [],
+        "short_description": d.get("short_description") or "",
+        "difficulty": d.get("difficulty") or "",
+        "points": d.get("points", 0),
+        "time_limit_ms": d.get("time_limit_ms", 2000),
+        "memory_limit_kb": d.get("memory_limit_kb", 65536),
         "sample_io": [
             {
-                "input_text": io.input_text,
-                "output": io.output,
-                "explanation": io.explanation or "",
+                "input_text": io.get("input_text"),
+                "output": io.get("output"),
+                "explanation": io.get("explanation") or "",
             }
-            for io in getattr(q, "sample_io", []) or []
+            for io in d.get("sample_io") or []
         ],
-        "allowed_languages": getattr(q, "allowed_languages", []) or [],
-        "predefined_boilerplates": getattr(q, "predefined_boilerplates", {}) or {},
-                "solution_code": getattr(q, "solution_code", {}) or {},
-
-        "published": getattr(q, "published", False),
+        "allowed_languages": d.get("allowed_languages") or [],
+        "published": d.get("published", False),
     }
 
 
+def _coding_facets() -> dict:
+    """
+    Filter dropdown values (topics/subtopics/tags/difficulty_levels) for the list
+    endpoint. The four distinct() scans run at most once per minute (see utils/cache.py).
+    """
+    name = Question._get_collection_name()
+    facets = get_question_facets(name)
+    if facets is None:
+        topics = Question.objects.distinct("topic") or []
+        subtopics = Question.objects.distinct("subtopic") or []
+        tags_list = Question.objects.distinct("tags") or []
+        difficulty_levels = Question.objects.distinct("difficulty") or []
+        facets = {
+            "topics": sorted(filter(None, topics)),
+            "subtopics": sorted(filter(None, subtopics)),
+            "tags": sorted(filter(None, tags_list)),
+            "difficulty_levels": sorted(filter(None, difficulty_levels)),
+        }
+        set_question_facets(name, facets)
+    return facets
+
+
 @coding_bp.route("/", methods=["GET"])
 @token_required
 def list_coding_questions():
@@ -62,91 +92,82 @@ def list_coding_questions():
       - topic (exact)
       - subtopic (exact)
       - difficulty (easy|medium|hard)
-      - search (text on title/short_description/long_description_markdown)
+      - search (text index on title/short_description/long_description_markdown;
+        terms under 3 chars use a substring match)
       - sort_by (points|time_limit_ms|difficulty|title|id)
       - sort_dir (asc|desc, default desc)
+      - optimize ('1' to skip the filtered count: total is only reported (estimated) when no
+        filter/search applies, and meta.has_next tells whether another page exists)
+      - after_id (with the default newest-first sort, return items older than this id instead
+        of skipping to `page`; pass meta.next_after_id from the previous page)
     """
-    params = request.args
-
-    # pagination
-    try:
-        page = max(1, int(params.get("page", 1)))
-    except Exception:
-        page = 1
-    try:
-        per_page = int(params.get("per_page", 20))
-        if per_page <= 0:
-            per_page = 20
-        per_page = min(per_page, 200)
-    except Exception:
-        per_page = 20
-
-    # filters
-    tags_param = params.get("tags")
-    tags = [t.strip() for t in tags_param.split(",") if t.strip()] if tags_param else []
-    topic = params.get("topic")
-    subtopic = params.get("subtopic")
-    difficulty = params.get("difficulty")
-    search = params.get("search", "").strip()
-
-    # sort
-    sort_by = params.get("sort_by", None)
-    sort_dir = params.get("sort_dir", "desc").lower()
-    sort_prefix = "-" if sort_dir == "desc" else ""
+    params = parse_list_params(request.args, difficulty_param="difficulty")
+    if params.after_id and not ObjectId.is_valid(params.after_id):
+        return response(False, "Invalid after_id"), 400
 
     query = {}
-    if tags:
-        query["tags__in"] = tags
-    if topic:
-        query["topic"] = topic
-    if subtopic:
-        query["subtopic"] = subtopic
-    if difficulty:
-        query["difficulty"] = difficulty
+    if params.tags:
+        query["tags__in"] = params.tags
+    if params.topic:
+        query["topic"] = params.topic
+    if params.subtopic:
+        query["subtopic"] = params.subtopic
+    if params.difficulty:
+        query["difficulty"] = params.difficulty
 
     try:
         qs = Question.objects(**query)
 
-        if search:
-            from mongoengine.queryset.visitor import Q as MQ
+        if len(params.search) >= MIN_TEXT_SEARCH:
+            qs = qs.search_text(params.search)
+        elif params.search:
+            # short term: keep the substring match
             qs = qs.filter(
-                MQ(title__icontains=search) |
-                MQ(short_description__icontains=search) |
-                MQ(long_description_markdown__icontains=search)
+                MQ(title__icontains=params.search) |
+                MQ(short_description__icontains=params.search) |
+                MQ(long_description_markdown__icontains=params.search)
             )
 
-        total = qs.count()
+        if not params.optimize:
+            total = qs.count()
+        elif not (query or params.search):
+            # unfiltered: collection metadata count, no scan
+            total = qs._document._get_collection().estimated_document_count()
+        else:
+            total = None
 
         allowed_sort_fields = {"points", "time_limit_ms", "difficulty", "title", "id"}
-        if sort_by and sort_by in allowed_sort_fields:
-            ordering = f"{sort_prefix}{sort_by}"
+        if params.sort_by and params.sort_by in allowed_sort_fields:
+            ordering = f"{params.sort_prefix}{params.sort_by}"
+        elif len(params.search) >= MIN_TEXT_SEARCH:
+            ordering = "$text_score"  # best matches first
         else:
             ordering = "-id"
 
-        qs = qs.order_by(ordering)
-
-        start = (page - 1) * per_page
-        end = start + per_page
-        items = list(qs[start:end])
+        qs = qs.order_by(ordering).only(*_CODING_LIST_FIELDS).as_pymongo()
 
-        total_pages = ceil(total / per_page) if per_page else 1
-        items_json = [q.to_safe_json() for q in items]
+        if params.after_id and ordering == "-id":
+            # index range on _id: cost does not grow with the page number
+            cursor = qs.filter(id__lt=ObjectId(params.after_id)).limit(params.per_page + 1)
+        else:
+            start = (params.page - 1) * params.per_page
+            end = start + params.per_page + 1  # one extra row tells us whether a next page exists
+            cursor = qs[start:end]
+        # serialize straight off the cursor; the extra probe row is dropped afterwards
+        items_json = [coding_list_to_json(d) for d in cursor]
+        has_next = len(items_json) > params.per_page
+        items_json = items_json[:params.per_page]
 
-        # derive meta (topics/tags/difficulties) by simple distinct queries; consider keeping a config doc
-        topics = Question.objects.distinct("topic") or []
-        subtopics = Question.objects.distinct("subtopic") or []
-        tags_list = Question.objects.distinct("tags") or []
-        difficulty_levels = Question.objects.distinct("difficulty") or []
+        total_pages = (total + params.per_page - 1) // params.per_page if total is not None else None
 
         meta = {
             "total": total,
-            "page": page,
-            "per_page": per_page,
+            "page": params.page,
+            "per_page": params.per_page,
             "total_pages": total_pages,
-            "topics": sorted([t for t in topics if t]),
-            "subtopics": sorted([s for s in subtopics if s]),
-            "tags": sorted([t for t in tags_list if t]),
-            "difficulty_levels": sorted([d for d in difficulty_levels if d]),
+            "has_next": has_next,
+            "next_after_id": items_json[-1]["id"] if has_next else None,
+            **_coding_facets(),
         }
 
         return response(True, "Coding questions fetched", {"items": items_json, "meta": meta}), 200
@@ -169,6 +190,7 @@ def duplicate_coding_to_section(question_id):
       - Finds Question by id
       - Duplicates it into TestQuestion
       - Duplicates TestCaseGroup documents (but reuses TestCase documents)
+      - All writes happen in one transaction; nothing is kept if the section does not exist
       - Appends an embedded SectionQuestion with question_type="coding" and coding_ref pointing to the new test question
       - Returns new test_question_id and section_id
     """
@@ -176,25 +198,25 @@ def duplicate_coding_to_section(question_id):
     section_id = data.get("section_id")
     if not section_id:
         return response(False, "Missing required field: section_id"), 400
+    # cheap id-only check first, so a bad section_id costs no copying work;
+    # the transaction below still guards against the section vanishing meanwhile
+    if not ObjectId.is_valid(section_id) or not Section.objects(id=section_id).only("id").first():
+        return response(False, f"Section not found: {section_id}"), 404
 
     try:
-        original = Question.objects.get(id=question_id)
-
-        # duplicate TestCaseGroup docs but reuse TestCase references
-        new_group_refs = []
-        for group_ref in (getattr(original, "testcase_groups", []) or []):
-            try:
-                # group_ref may be an object id or TestCaseGroup instance
-                # attempt to load the group document if needed
-                if isinstance(group_ref, str):
-                    orig_group = TestCaseGroup.objects.get(id=group_ref)
-                else:
-                    orig_group = group_ref
-            except Exception:
-                # skip invalid group references
-                continue
-
-            new_group = TestCaseGroup(
+        # no_dereference: only the group ids are needed, not the group documents
+        original = Question.objects.no_dereference().get(id=question_id)
+
+        # duplicate TestCaseGroup docs but reuse TestCase references:
+        # one query loads every original group, one insert_many writes the copies
+        group_ids = [getattr(g, "id", g) for g in (getattr(original, "testcase_groups", []) or [])]
+        valid_group_ids = [gid for gid in group_ids if ObjectId.is_valid(str(gid))]
+        orig_groups = {
+            str(g.id): g for g in TestCaseGroup.objects(id__in=valid_group_ids).no_dereference()
+        } if valid_group_ids else {}
+
+        new_groups = [
+            TestCaseGroup(
                 question_id=str(original.id),  # denormalized link to parent; keep original id or change if you prefer
                 name=orig_group.name,
                 weight=getattr(orig_group, "weight", 0),
@@ -204,8 +226,13 @@ def duplicate_coding_to_section(question_id):
                 # change this to create new TestCase documents and reference them instead.
                 cases=list(getattr(orig_group, "cases", []) or [])
             )
-            new_group.save()
-            new_group_refs.append(new_group)  # store the saved doc reference
+            # keep the original group order; invalid/missing group references are skipped
+            for orig_group in (orig_groups.get(str(gid)) for gid in group_ids)
+            if orig_group is not None
+        ]
+        # ids are assigned up front so the question can reference the groups before they are written
+        for g in new_groups:
+            g.id = ObjectId()
 
         # create the TestQuestion copy (copy most fields; recreate embedded docs as necessary)
         test_q = TestQuestion(
@@ -225,7 +252,7 @@ def duplicate_coding_to_section(question_id):
             run_code_enabled=original.run_code_enabled,
             submission_enabled=original.submission_enabled,
             show_boilerplates=original.show_boilerplates,
-            testcase_groups=[g for g in new_group_refs],
+            testcase_groups=[g.id for g in new_groups],
             published=original.published,
             version=original.version,
             authors=list(original.authors or []),
@@ -237,25 +264,35 @@ def duplicate_coding_to_section(question_id):
             # created_by=getattr(original, "created_by", {"id": "system", "name": "System"}),
         )
 
-        test_q.save()
-
-        # attach to section
-        try:
-            section = Section.objects.get(id=section_id)
-        except DoesNotExist:
-            # optional: rollback created groups & test_q here if you want strict behavior
-            # for now, leave them and inform client that section was not found
-            return response(False, f"Section not found: {section_id}"), 404
-
-        sq = SectionQuestion(question_type="coding", coding_ref=test_q)
-        section.questions = section.questions or []
-        section.questions.append(sq)
-        section.save()
+        # groups, question and section link are written in one transaction,
+        # so a missing section leaves no orphaned copies behind
+        for g in new_groups:
+            g.validate()
+        test_q.validate()
+        client = get_db().client
+        with client.start_session() as session:
+            with session.start_transaction():
+                if new_groups:
+                    TestCaseGroup._get_collection().insert_many(
+                        [g.to_mongo() for g in new_groups], session=session
+                    )
+                test_q.id = TestQuestion._get_collection().insert_one(
+                    test_q.to_mongo(), session=session
+                ).inserted_id
+                sq = SectionQuestion(question_type="coding", coding_ref=test_q)
+                pushed = Section._get_collection().update_one(
+                    {"_id": ObjectId(section_id)},
+                    {"$push": {"questions": sq.to_mongo()}},
+                    session=session,
+                )
+                if pushed.matched_count == 0:
+                    session.abort_transaction()
+                    return response(False, f"Section not found: {section_id}"), 404
 
         return response(True, "Coding question duplicated into TestQuestion and added to section", {
             "original_question_id": str(original.id),
             "test_question_id": str(test_q.id),
-            "section_id": str(section.id)
+            "section_id": section_id
         }), 201
 
     except DoesNotExist:
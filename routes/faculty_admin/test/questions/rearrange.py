@@ -1,53 +1,91 @@
 # routes/rearrange.py
+import uuid
 from flask import Blueprint, request
-from math import ceil
+from bson import ObjectId
 from mongoengine.errors import ValidationError, DoesNotExist
+from mongoengine.queryset.visitor import Q as MQ
 
 # reuse your project's auth + response helpers
 from routes.faculty_admin.test.tests import token_required
 from utils.response import response
+from utils.list_params import parse_list_params, MIN_TEXT_SEARCH
+from utils.cache import get_question_facets, set_question_facets
 
 # models (adjust import paths if needed)
-from models.questions.rearrange import Rearrange, TestRearrange, Item, Image
+from models.questions.rearrange import Rearrange, TestRearrange
 from models.test.section import Section, SectionQuestion
+from mongoengine import get_db
 
 rearrange_bp = Blueprint("rearrange", __name__, url_prefix="/test/questions/rearranges")
 
 
-def rearrange_minimal_to_json(r: Rearrange) -> dict:
+# item values longer than this are cut in list previews
+_MAX_PREVIEW = 120
+
+# fields read by rearrange_minimal_to_json; the list query projects only these
+_REARRANGE_LIST_FIELDS = (
+    "title", "prompt", "difficulty_level", "topic", "subtopic", "tags", "correct_order",
+    "marks", "negative_marks", "time_limit", "is_drag_and_drop", "items", "created_by",
+)
+
+
+def rearrange_minimal_to_json(d: dict) -> dict:
     """
-    Minimal representation used by list endpoints.
+    Minimal representation used by list endpoints, from a raw (as_pymongo) document.
     images omitted intentionally for compactness.
     """
     items_json = []
-    for it in r.items or []:
+    for it in d.get("items") or []:
+        value = it.get("value")
         items_json.append({
-            "id": it.item_id,
-            "value_preview": (it.value[:120] + "…") if it.value and len(it.value) > 120 else it.value,
-            "has_images": bool(it.images)
+            "id": it.get("item_id"),
+            "value_preview": value if not value or len(value) <= _MAX_PREVIEW else value[:_MAX_PREVIEW] + "…",
+            "has_images": bool(it.get("images"))
         })
 
-    created_by = r.created_by or {}
+    created_by = d.get("created_by") or {}
     created_by_min = {"id": created_by.get("id"), "name": created_by.get("name")} if created_by else {}
 
     return {
-        "id": str(r.id),
-        "title": r.title,
-        "prompt": r.prompt,
-        "difficulty_level": r.difficulty_level,
-        "topic": r.topic,
-        "subtopic": r.subtopic,
-        "tags": r.tags or [],
-        "correct_order" : r.correct_order,
-        "marks": r.marks,
-        "negative_marks": getattr(r, "negative_marks", None),
-        "time_limit": r.time_limit,
-        "is_drag_and_drop": bool(r.is_drag_and_drop),
+        "id": str(d["_id"]),
+        "title": d.get("title"),
+        "prompt": d.get("prompt"),
+        "difficulty_level": d.get("difficulty_level"),
+        "topic": d.get("topic"),
+        "subtopic": d.get("subtopic"),
+        "tags": d.get("tags") or [],
+        "correct_order" : d.get("correct_order") or [],
+        "marks": d.get("marks"),
+        "negative_marks": d.get("negative_marks"),
+        "time_limit": d.get("time_limit"),
+        "is_drag_and_drop": bool(d.get("is_drag_and_drop")),
         "items": items_json,
         "created_by": created_by_min,
     }
 
 
+def _rearrange_facets() -> dict:
+    """
+    Filter dropdown values (topics/subtopics/tags/difficulty_levels) for the list
+    endpoint. The four distinct() scans run at most once per minute (see utils/cache.py).
+    """
+    name = Rearrange._get_collection_name()
+    facets = get_question_facets(name)
+    if facets is None:
+        topics = Rearrange.objects.distinct("topic") or []
+        subtopics = Rearrange.objects.distinct("subtopic") or []
+        tags_list = Rearrange.objects.distinct("tags") or []
+        difficulty_levels = Rearrange.objects.distinct("difficulty_level") or []
+        facets = {
+            "topics": sorted(filter(None, topics)),
+            "subtopics": sorted(filter(None, subtopics)),
+            "tags": sorted(filter(None, tags_list)),
+            "difficulty_levels": sorted(filter(None, difficulty_levels)),
+        }
+        set_question_facets(name, facets)
+    return facets
+
+
 @rearrange_bp.route("/", methods=["GET"])
 @token_required
 def list_rearranges():
@@ -60,95 +98,77 @@ def list_rearranges():
       - topic (exact match)
       - subtopic (exact match)
       - difficulty_level (Easy|Medium|Hard)
-      - search (text search against title/prompt)
+      - search (text index on title/prompt; terms under 3 chars use a substring match)
       - sort_by (marks|difficulty_level|time_limit|title|id)
       - sort_dir (asc|desc, default desc)
+      - optimize ('1' to skip the filtered count: total is only reported (estimated) when no
+        filter/search applies, and meta.has_next tells whether another page exists)
+      - after_id (with the default newest-first sort, return items older than this id instead
+        of skipping to `page`; pass meta.next_after_id from the previous page)
     """
-    params = request.args
-
-    # pagination
-    try:
-        page = max(1, int(params.get("page", 1)))
-    except Exception:
-        page = 1
-    try:
-        per_page = int(params.get("per_page", 20))
-        if per_page <= 0:
-            per_page = 20
-        per_page = min(per_page, 200)
-    except Exception:
-        per_page = 20
-
-    # filters
-    tags_param = params.get("tags")
-    tags = [t.strip() for t in tags_param.split(",") if t.strip()] if tags_param else []
-    topic = params.get("topic")
-    subtopic = params.get("subtopic")
-    difficulty_level = params.get("difficulty_level")
-    search = params.get("search", "").strip()
-
-    # sort
-    sort_by = params.get("sort_by", None)
-    sort_dir = params.get("sort_dir", "desc").lower()
-    sort_prefix = "-" if sort_dir == "desc" else ""
+    params = parse_list_params(request.args, difficulty_param="difficulty_level")
+    if params.after_id and not ObjectId.is_valid(params.after_id):
+        return response(False, "Invalid after_id"), 400
 
     query = {}
-    if tags:
-        query["tags__in"] = tags
-    if topic:
-        query["topic"] = topic
-    if subtopic:
-        query["subtopic"] = subtopic
-    if difficulty_level:
-        query["difficulty_level"] = difficulty_level
+    if params.tags:
+        query["tags__in"] = params.tags
+    if params.topic:
+        query["topic"] = params.topic
+    if params.subtopic:
+        query["subtopic"] = params.subtopic
+    if params.difficulty:
+        query["difficulty_level"] = params.difficulty
 
     try:
         qs = Rearrange.objects(**query)
 
-        if search:
-            from mongoengine.queryset.visitor import Q as MQ
-            qs = qs.filter(MQ(title__icontains=search) | MQ(prompt__icontains=search))
-
-        total = qs.count()
+        if len(params.search) >= MIN_TEXT_SEARCH:
+            qs = qs.search_text(params.search)
+        elif params.search:
+            # short term: keep the substring match
+            qs = qs.filter(MQ(title__icontains=params.search) | MQ(prompt__icontains=params.search))
+
+        if not params.optimize:
+            total = qs.count()
+        elif not (query or params.search):
+            # unfiltered: collection metadata count, no scan
+            total = qs._document._get_collection().estimated_document_count()
+        else:
+            total = None
 
         allowed_sort_fields = {"marks", "negative_marks", "difficulty_level", "time_limit", "title", "id"}
-        if sort_by and sort_by in allowed_sort_fields:
-            ordering = f"{sort_prefix}{sort_by}"
+        if params.sort_by and params.sort_by in allowed_sort_fields:
+            ordering = f"{params.sort_prefix}{params.sort_by}"
+        elif len(params.search) >= MIN_TEXT_SEARCH:
+            ordering = "$text_score"  # best matches first
         else:
             ordering = "-id"
 
-        qs = qs.order_by(ordering)
-
-        start = (page - 1) * per_page
-        end = start + per_page
-        items = list(qs[start:end])
+        qs = qs.order_by(ordering).only(*_REARRANGE_LIST_FIELDS).as_pymongo()
 
-        total_pages = ceil(total / per_page) if per_page else 1
-        items_json = [rearrange_minimal_to_json(r) for r in items]
-
-        # attempt to read a config-like doc if you create one for rearranges; fallback to distinct queries
-        try:
-            # if you have a RearrangeConfig doc, prefer it. If not, fallback:
-            from models.questions.rearrange import RearrangeConfig
-            config = RearrangeConfig.objects.first()
-        except Exception:
-            config = None
+        if params.after_id and ordering == "-id":
+            # index range on _id: cost does not grow with the page number
+            cursor = qs.filter(id__lt=ObjectId(params.after_id)).limit(params.per_page + 1)
+        else:
+            start = (params.page - 1) * params.per_page
+            end = start + params.per_page + 1  # one extra row tells us whether a next page exists
+            cursor = qs[start:end]
+        # serialize straight off the cursor; the extra probe row is dropped afterwards
+        items_json = [rearrange_minimal_to_json(d) for d in cursor]
+        has_next = len(items_json) > params.per_page
+        items_json = items_json[:params.per_page]
 
-        
-        topics = Rearrange.objects.distinct("topic") or []
-        subtopics = Rearrange.objects.distinct("subtopic") or []
-        tags_list = Rearrange.objects.distinct("tags") or []
-        difficulty_levels = Rearrange.objects.distinct("difficulty_level") or []
+        total_pages = (total + params.per_page - 1) // params.per_page if total is not None else None
 
         meta = {
             "total": total,
-            "page": page,
-            "per_page": per_page,
+            "page": params.page,
+            "per_page": params.per_page,
             "total_pages": total_pages,
-            "topics": sorted([t for t in topics if t]),
-            "subtopics": sorted([s for s in subtopics if s]),
-            "tags": sorted([t for t in tags_list if t]),
-            "difficulty_levels": sorted([d for d in difficulty_levels if d]),
+            "has_next": has_next,
+            "next_after_id": items_json[-1]["id"] if has_next else None,
+            **_rearrange_facets(),
         }
 
         return response(True, "Rearrange questions fetched", {"items": items_json, "meta": meta}), 200
@@ -178,82 +198,95 @@ def duplicate_rearrange_to_section(rearrange_id):
     section_id = data.get("section_id")
     if not section_id:
         return response(False, "Missing required field: section_id"), 400
+    # cheap id-only check first, so a bad section_id costs no copying work;
+    # the transaction below still guards against the section vanishing meanwhile
+    if not ObjectId.is_valid(section_id) or not Section.objects(id=section_id).only("id").first():
+        return response(False, f"Section not found: {section_id}"), 404
 
     try:
-        original = Rearrange.objects.get(id=rearrange_id)
+        # raw documents end to end: no Item/Image EmbeddedDocuments are built for the copy
+        original = Rearrange.objects(id=rearrange_id).as_pymongo().first()
+        if original is None:
+            raise DoesNotExist
 
-        # helper to duplicate an Image embedded doc (generate new image_id by default)
+        # duplicate an image dict with a fresh image_id
         def dup_image(orig_img):
-            return Image(
-                label=getattr(orig_img, "label", None),
-                url=getattr(orig_img, "url", None),
-                alt_text=getattr(orig_img, "alt_text", None),
-                metadata=getattr(orig_img, "metadata", None) or {}
-            )
-
-        # duplicate items and build mapping old_item_id -> new_item_id
-        new_items = []
-        old_to_new_item_id = {}
-        for orig_item in (original.items or []):
-            copied_images = [dup_image(img) for img in (orig_item.images or [])]
-            new_item = Item(value=orig_item.value, images=copied_images)
-            # new_item.item_id will be created by default lambda on instantiation
-            new_items.append(new_item)
-            old_to_new_item_id[orig_item.item_id] = new_item.item_id
-
-        # remap correct_order using mapping
-        new_correct_order = []
-        for old_id in (original.correct_order or []):
-            new_id = old_to_new_item_id.get(old_id)
-            if new_id:
-                new_correct_order.append(new_id)
-            else:
-                # skip unknown ids; alternatively raise an error if you want strict behavior
-                pass
-
-        # duplicate question-level and explanation images
-        new_question_images = [dup_image(i) for i in (original.question_images or [])]
-        new_explanation_images = [dup_image(i) for i in (original.explanation_images or [])]
-
-        test_rearrange = TestRearrange(
-            title=original.title,
-            prompt=original.prompt,
-            question_images=new_question_images,
-            items=new_items,
-            correct_order=new_correct_order,
-            is_drag_and_drop=original.is_drag_and_drop,
-            marks=original.marks,
-            negative_marks=original.negative_marks,
-            difficulty_level=original.difficulty_level,
-            explanation=original.explanation,
-            explanation_images=new_explanation_images,
-            tags=list(original.tags or []),
-            time_limit=original.time_limit,
-            topic=original.topic,
-            subtopic=original.subtopic,
-            created_by=getattr(original, "created_by", {"id": "system", "name": "System"})
-        )
-
-        test_rearrange.save()
-
-        # attach to section
+            return {
+                "image_id": str(uuid.uuid4()),
+                "label": orig_img.get("label"),
+                "url": orig_img.get("url"),
+                "alt_text": orig_img.get("alt_text"),
+                "metadata": orig_img.get("metadata") or {},
+            }
+
+        # duplicate items, then remap correct_order through old_item_id -> new_item_id
+        orig_items = original.get("items") or []
+        new_items = [
+            {
+                "item_id": str(uuid.uuid4()),
+                "value": it.get("value"),
+                "images": [dup_image(img) for img in (it.get("images") or [])],
+            }
+            for it in orig_items
+        ]
+        id_map = {old.get("item_id"): new["item_id"] for old, new in zip(orig_items, new_items)}
+        # unknown ids are skipped; alternatively raise an error if you want strict behavior
+        new_correct_order = [id_map[o] for o in (original.get("correct_order") or []) if o in id_map]
+
+        test_rearrange = {
+            "title": original.get("title"),
+            "prompt": original.get("prompt"),
+            "question_images": [dup_image(i) for i in (original.get("question_images") or [])],
+            "items": new_items,
+            "correct_order": new_correct_order,
+            "is_drag_and_drop": original.get("is_drag_and_drop", True),
+            "marks": original.get("marks"),
+            "negative_marks": original.get("negative_marks"),
+            "difficulty_level": original.get("difficulty_level"),
+            "explanation": original.get("explanation"),
+            "explanation_images": [dup_image(i) for i in (original.get("explanation_images") or [])],
+            "tags": list(original.get("tags") or []),
+            "time_limit": original.get("time_limit"),
+            "topic": original.get("topic"),
+            "subtopic": original.get("subtopic"),
+            "created_by": original.get("created_by") or {"id": "system", "name": "System"},
+        }
+        # mongoengine does not store unset fields; keep the copy the same shape
+        test_rearrange = {k: v for k, v in test_rearrange.items() if v is not None}
+
+        # insert the copy and link it to the section in one transaction,
+        # so a missing section never leaves an orphaned TestRearrange behind
+        client = get_db().client
+        with client.start_session() as session:
+            with session.start_transaction():
+                test_rearrange_id = TestRearrange._get_collection().insert_one(
+                    test_rearrange, session=session
+                ).inserted_id
+                sq = SectionQuestion(question_type="rearrange", rearrange_ref=test_rearrange_id)
+                pushed = Section._get_collection().update_one(
+                    {"_id": ObjectId(section_id)},
+                    {"$push": {"questions": sq.to_mongo()}},
+                    session=session,
+                )
+                if pushed.matched_count == 0:
+                    session.abort_transaction()
+                    return response(False, f"Section not found: {section_id}"), 404
+
+        # same best-effort config refresh that TestRearrange.save() would have done
         try:
-            section = Section.objects.get(id=section_id)
-        except DoesNotExist:
-            # Do NOT attempt a DB transaction here; simply inform client.
-            # If you want rollback behavior, uncomment the deletion below.
-            # test_rearrange.delete()
-            return response(False, f"Section not found: {section_id}"), 404
-
-        sq = SectionQuestion(question_type="rearrange", rearrange_ref=test_rearrange)
-        section.questions = section.questions or []
-        section.questions.append(sq)
-        section.save()
+            TestRearrange(
+                difficulty_level=test_rearrange.get("difficulty_level"),
+                topic=test_rearrange.get("topic"),
+                subtopic=test_rearrange.get("subtopic"),
+                tags=test_rearrange.get("tags"),
+            )._update_config_for_collection()
+        except Exception:
+            pass
 
         return response(True, "Rearrange duplicated into TestRearrange and added to section", {
-            "original_rearrange_id": str(original.id),
-            "test_rearrange_id": str(test_rearrange.id),
-            "section_id": str(section.id)
+            "original_rearrange_id": str(original["_id"]),
+            "test_rearrange_id": str(test_rearrange_id),
+            "section_id": section_id
         }), 201
 
     except DoesNotExist:
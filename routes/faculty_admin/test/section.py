@@ -2,10 +2,13 @@
 
 from flask import Blueprint, request
 from mongoengine.errors import ValidationError, NotUniqueError
+from bson import ObjectId
+from pymongo import UpdateMany
 from datetime import datetime
 
-from utils.response import response
+from utils.response import response, etag_response
 from utils.jwt import verify_access_token
+from utils.cache import get_token_payload, set_token_payload, invalidate_test_meta
 from models.test.test import Test
 from math import ceil
 from mongoengine import Q
@@ -29,11 +32,14 @@ def token_required(f):
         if not auth_header or not auth_header.startswith("Bearer "):
             return response(False, "Authorization header missing or malformed"), 401
 
-        token = auth_header.split(" ", 1)[1].strip()
-        try:
-            payload = verify_access_token(token)
-        except ValueError as e:
-            return response(False, str(e)), 401
+        token = auth_header[7:].strip()  # after "Bearer "
+        payload = get_token_payload(token)
+        if payload is None:
+            try:
+                payload = verify_access_token(token)
+            except ValueError as e:
+                return response(False, str(e)), 401
+            set_token_payload(token, payload)
 
         request.token_payload = payload
         return f(*args, **kwargs)
@@ -41,24 +47,43 @@ def token_required(f):
     return decorated
 
 
+_TRUE_STRINGS = frozenset({"true", "1", "yes", "y", "t"})
+_FALSE_STRINGS = frozenset({"false", "0", "no", "n", "f", ""})
+
+
 def parse_bool(val, default=False):
     """Utility to parse boolean-ish values from JSON payloads.
     Accepts actual bools, numbers (0/1), and strings "true"/"false","1","0","yes","no".
     """
+    # real JSON booleans are the common case
+    if val is True or val is False:
+        return val
     if val is None:
         return default
-    if isinstance(val, bool):
-        return val
     if isinstance(val, (int, float)):
         return bool(val)
     s = str(val).strip().lower()
-    if s in ("true", "1", "yes", "y", "t"):
+    if s in _TRUE_STRINGS:
         return True
-    if s in ("false", "0", "no", "n", "f", ""):
+    if s in _FALSE_STRINGS:
         return False
     # fallback
     return default
 
+def parse_duration(val, empty=None):
+    """Parse a section duration (minutes) from a JSON payload.
+    Returns (duration, error); null/blank values give `empty`.
+    """
+    if val is None or (isinstance(val, str) and val.strip() == ""):
+        return empty, None
+    try:
+        duration = int(val)
+    except (ValueError, TypeError):
+        return None, "Field 'duration' must be an integer (minutes)"
+    if duration < 0:
+        return None, "Field 'duration' must be >= 0"
+    return duration, None
+
 # POST /tests/<test_id>/sections
 # POST /<test_id>/sections
 @test_bp.route("/<test_id>/sections", methods=["POST"])
@@ -79,7 +104,7 @@ def add_section_to_test(test_id):
     if not name:
         return response(False, "Section 'name' is required"), 400
 
-    time_restricted = bool(data.get("time_restricted", False))
+    time_restricted = parse_bool(data.get("time_restricted", False))
     description = data.get("description", "")
     instructions = data.get("instructions", "")
 # new boolean fields (default False)
@@ -87,23 +112,20 @@ def add_section_to_test(test_id):
     is_shuffle_options = parse_bool(data.get("is_shuffle_options", False))
 
     # parse duration if provided
-    duration = data.get("duration", None)
-    if duration is not None:
-        try:
-            duration = int(duration)
-        except (ValueError, TypeError):
-            return response(False, "Field 'duration' must be an integer (minutes)"), 400
-        if duration < 0:
-            return response(False, "Field 'duration' must be >= 0"), 400
+    duration, error = parse_duration(data.get("duration", None), empty=None)
+    if error:
+        return response(False, error), 400
 
     # if time_restricted, duration must be positive
     if time_restricted and (duration is None or duration <= 0):
         return response(False, "A positive 'duration' (minutes) is required when time_restricted is true"), 400
 
-    # ensure test exists
+    # ensure test exists (id only: the section is attached with a $push below)
     try:
-        test = Test.objects.get(id=test_id)
-    except (DoesNotExist, ValidationError):
+        test = Test.objects(id=test_id).only("id").first()
+    except ValidationError:
+        test = None
+    if test is None:
         return response(False, "Test not found"), 404
 
     # create section
@@ -116,19 +138,18 @@ def add_section_to_test(test_id):
         is_shuffle_question=is_shuffle_question,
         is_shuffle_options=is_shuffle_options
     )
+    # validate with the model, then insert the document directly (no save() bookkeeping)
     try:
-        section.save()
+        section.validate()
+        section.id = Section._get_collection().insert_one(section.to_mongo()).inserted_id
     except (ValidationError, ValueError) as e:
         return response(False, f"Error creating section: {str(e)}"), 400
 
-    # attach reference to appropriate list on Test
-    if time_restricted:
-        test.sections_time_restricted = (test.sections_time_restricted or []) + [section]
-    else:
-        test.sections_open = (test.sections_open or []) + [section]
-
+    # attach reference to appropriate list on Test ($push: only the new id is sent)
+    field = "sections_time_restricted" if time_restricted else "sections_open"
     try:
-        test.save()
+        Test.objects(id=test.id).update_one(**{f"push__{field}": section})
+        invalidate_test_meta(test.id)  # total_sections changed
     except Exception as e:
         # rollback created section if attaching fails (best-effort)
         try:
@@ -150,83 +171,121 @@ def update_section(section_id):
     """
     data = request.get_json() or {}
     try:
-        section = Section.objects.get(id=section_id)
+        # question refs are only counted by to_json(), never dereferenced
+        section = Section.objects(id=section_id).no_dereference().get()
     except (DoesNotExist, ValidationError):
         return response(False, "Section not found"), 404
 
-    updated = False
     old_time_restricted = bool(section.time_restricted)
 
+    # incoming values, then only the ones that differ from what is stored
+    incoming = {}
     if "name" in data and data["name"] is not None:
-        section.name = data["name"]
-        updated = True
+        incoming["name"] = data["name"]
     if "description" in data:
-        section.description = data["description"] or ""
-        updated = True
+        incoming["description"] = data["description"] or ""
     if "instructions" in data:
-        section.instructions = data["instructions"] or ""
-        updated = True
+        incoming["instructions"] = data["instructions"] or ""
     if "time_restricted" in data:
-        section.time_restricted = bool(data["time_restricted"])
-        updated = True
+        incoming["time_restricted"] = parse_bool(data["time_restricted"])
  # new shuffle flags
     if "is_shuffle_question" in data:
-        section.is_shuffle_question = parse_bool(data.get("is_shuffle_question"), default=bool(section.is_shuffle_question))
-        updated = True
+        incoming["is_shuffle_question"] = parse_bool(data.get("is_shuffle_question"), default=bool(section.is_shuffle_question))
     if "is_shuffle_options" in data:
-        section.is_shuffle_options = parse_bool(data.get("is_shuffle_options"), default=bool(section.is_shuffle_options))
-        updated = True
+        incoming["is_shuffle_options"] = parse_bool(data.get("is_shuffle_options"), default=bool(section.is_shuffle_options))
     # duration handling: validate if provided
     if "duration" in data:
-        dur_raw = data["duration"]
         # allow null/empty to mean 0
-        if dur_raw is None or (isinstance(dur_raw, str) and dur_raw.strip() == ""):
-            duration = 0
-        else:
-            try:
-                duration = int(dur_raw)
-            except (ValueError, TypeError):
-                return response(False, "Field 'duration' must be an integer (minutes)"), 400
-            if duration < 0:
-                return response(False, "Field 'duration' must be >= 0"), 400
-        section.duration = duration
-        updated = True
-
-    if not updated:
+        duration, error = parse_duration(data["duration"], empty=0)
+        if error:
+            return response(False, error), 400
+        incoming["duration"] = duration
+
+    if not incoming:
         return response(False, "No valid fields provided to update"), 400
 
+    dirty_fields = {k: v for k, v in incoming.items() if v != getattr(section, k)}
+    if not dirty_fields:
+        # client re-sent the current values: nothing to write
+        return response(True, "Section updated", section.to_json()), 200
+    for k, v in dirty_fields.items():
+        setattr(section, k, v)
+
     # If changing to time_restricted=True, ensure a positive duration exists (either provided just now or existing)
     new_time_restricted = bool(section.time_restricted)
     if new_time_restricted and (section.duration is None or int(section.duration) <= 0):
         # If the request included duration but it was invalid, we'd already have returned. Here check if missing.
         return response(False, "Cannot enable time_restricted without a positive 'duration' (minutes)"), 400
 
+    # $set only the changed fields instead of re-saving the whole document
+    section.updated_at = datetime.utcnow()
     try:
-        section.save()
+        section.validate()
+        Section.objects(id=section.id).update_one(
+            **{f"set__{k}": v for k, v in dirty_fields.items()}, set__updated_at=section.updated_at
+        )
     except (ValidationError, ValueError) as e:
         return response(False, f"Error updating section: {str(e)}"), 400
 
     # If time_restricted changed, move references in Tests
     if old_time_restricted != new_time_restricted:
         try:
+            # one server-side update moves the reference on every Test that holds it
             if old_time_restricted:
                 # was in time_restricted list, move to open
-                tests_with_old = Test.objects(sections_time_restricted=section)
-                for t in tests_with_old:
-                    t.update(pull__sections_time_restricted=section)
-                    t.update(push__sections_open=section)
+                src, dst = "sections_time_restricted", "sections_open"
             else:
                 # was in open list, move to time_restricted
-                tests_with_old = Test.objects(sections_open=section)
-                for t in tests_with_old:
-                    t.update(pull__sections_open=section)
-                    t.update(push__sections_time_restricted=section)
+                src, dst = "sections_open", "sections_time_restricted"
+            Test._get_collection().bulk_write([
+                UpdateMany({src: section.id}, {"$pull": {src: section.id}, "$push": {dst: section.id}})
+            ], ordered=False)
         except Exception as e:
             # log and return partial success (section updated but moving refs failed)
             return response(False, f"Section updated but failed to move references: {str(e)}"), 500
 
     return response(True, "Section updated", section.to_json()), 200
 
+def _iso(dt):
+    return dt.isoformat() if dt else None
+
+
+def _test_raw_to_minimal_json(d: dict) -> dict:
+    """Test.to_minimal_json() for a raw (aggregation) document."""
+    duration_seconds = d.get("duration_seconds")
+    return {
+        "id": str(d["_id"]),
+        "test_name": d.get("test_name"),
+        "tags": d.get("tags") or [],
+        "description": d.get("description"),
+        "instructions": d.get("instructions"),
+        "notes": d.get("notes"),
+        "duration_seconds": int(duration_seconds) if duration_seconds is not None else None,
+        "start_datetime": _iso(d.get("start_datetime")),
+        "end_datetime": _iso(d.get("end_datetime")),
+        "total_sections": len(d.get("sections_time_restricted") or []) + len(d.get("sections_open") or []),
+        "no_of_students": 0,
+    }
+
+
+def _section_raw_to_json(d: dict) -> dict:
+    """Section.to_json() for a raw (aggregation) document."""
+    duration = d.get("duration")
+    return {
+        "id": str(d["_id"]),
+        "name": d.get("name"),
+        "description": d.get("description") or "",
+        "instructions": d.get("instructions") or "",
+        "duration": int(duration) if duration is not None else 0,
+        "no_of_questions": len(d.get("questions") or []),
+        "time_restricted": d.get("time_restricted", False),
+        "is_shuffle_question": d.get("is_shuffle_question", False),
+        "is_shuffle_options": d.get("is_shuffle_options", False),
+        "created_at": _iso(d.get("created_at")),
+        "updated_at": _iso(d.get("updated_at")),
+    }
+
+
 # GET /tests/<test_id>/sections
 @test_bp.route("/<test_id>/sections", methods=["GET"])
 @token_required
@@ -235,26 +294,35 @@ def get_sections_by_test(test_id):
     Return sections attached to a test, separated into time_restricted and open lists.
     Response data: { "sections_time_restricted": [...], "sections_open": [...] }
     """
-    try:
-        test = Test.objects.get(id=test_id)
-    except (DoesNotExist, ValidationError):
+    if not ObjectId.is_valid(test_id):
         return response(False, "Test not found"), 404
 
-    # gather ids from test (may be empty)
-    time_ids = [s.id for s in (test.sections_time_restricted or [])]
-    open_ids = [s.id for s in (test.sections_open or [])]
-
-    # fetch Section documents in two queries
-    sections_time = list(Section.objects(id__in=time_ids)) if time_ids else []
-    sections_open = list(Section.objects(id__in=open_ids)) if open_ids else []
+    # one round trip: the server joins both section lists onto the test
+    sections_coll = Section._get_collection_name()
+    pipeline = [
+        {"$match": {"_id": ObjectId(test_id)}},
+        {"$lookup": {"from": sections_coll, "localField": "sections_time_restricted",
+                     "foreignField": "_id", "as": "sections_time_restricted_docs"}},
+        {"$lookup": {"from": sections_coll, "localField": "sections_open",
+                     "foreignField": "_id", "as": "sections_open_docs"}},
+        {"$project": {
+            "test_name": 1, "tags": 1, "description": 1, "instructions": 1, "notes": 1,
+            "duration_seconds": 1, "start_datetime": 1, "end_datetime": 1,
+            "sections_time_restricted": 1, "sections_open": 1,
+            "sections_time_restricted_docs": 1, "sections_open_docs": 1,
+        }},
+    ]
+    test = next(Test._get_collection().aggregate(pipeline), None)
+    if test is None:
+        return response(False, "Test not found"), 404
 
     # convert to json
     data = {
-        "test" : test.to_minimal_json(),
-        "sections_time_restricted": [s.to_json() for s in sections_time],
-        "sections_open": [s.to_json() for s in sections_open],
+        "test": _test_raw_to_minimal_json(test),
+        "sections_time_restricted": [_section_raw_to_json(d) for d in test["sections_time_restricted_docs"]],
+        "sections_open": [_section_raw_to_json(d) for d in test["sections_open_docs"]],
     }
-    return response(True, "Sections fetched", data), 200
+    return etag_response(True, "Sections fetched", data)
 
 
 # Add these imports near top of your routes/test.py
@@ -265,8 +333,15 @@ from models.test.section import Section, SectionQuestion  # Section & embedded w
 from models.questions.mcq import MCQ as SourceMCQ
 # Target MCQ: the test-specific MCQ model where duplicates should be stored
 from models.test.questions.mcq import MCQ as TestMCQ, Option as TestOption
+# Question models the SectionQuestion references point at
+from models.questions.mcq import TestMCQ as SectionMCQ
+from models.questions.coding import TestQuestion as SectionCodingQuestion
+from models.questions.rearrange import TestRearrange as SectionRearrange
 
 
+# upper bound for ?limit= on the section questions endpoint
+_MAX_QUESTIONS_PAGE = 200
+
 
 @test_bp.route("/sections/<section_id>/questions", methods=["GET"])
 @token_required
@@ -274,39 +349,75 @@ def get_questions_by_section(section_id):
     """
     Fetch all questions for a given section.
     Returns a list of questions with their type and details.
+
+    Optional paging: ?limit=N (max 200) returns {"questions": [...], "next_cursor": ...};
+    pass next_cursor back as ?after= for the following page.
     """
+    # raw section: references stay plain ObjectIds, nothing is dereferenced one by one
     try:
-        section = Section.objects.get(id=section_id)
-    except (DoesNotExist, ValidationError):
+        section = Section.objects(id=section_id).only("questions").as_pymongo().first()
+    except ValidationError:
+        section = None
+    if section is None:
         return response(False, "Section not found"), 404
+    questions = section.get("questions") or []
+    ref_field = {"mcq": "mcq_ref", "coding": "coding_ref", "rearrange": "rearrange_ref"}
+
+    def ref_of(sq):
+        return sq.get(ref_field.get(sq.get("question_type"), ""))
+
+    # slice before anything is fetched, so a page only loads its own questions
+    limit_raw = request.args.get("limit")
+    paginate = limit_raw is not None
+    next_cursor = None
+    if paginate:
+        try:
+            limit = max(1, min(int(limit_raw), _MAX_QUESTIONS_PAGE))
+        except ValueError:
+            return response(False, "Invalid limit"), 400
+        after = request.args.get("after")
+        start = 0
+        if after:
+            start = next((i + 1 for i, sq in enumerate(questions) if str(ref_of(sq)) == after), None)
+            if start is None:
+                return response(False, "Invalid cursor"), 400
+        page = questions[start:start + limit]
+        if start + limit < len(questions) and page:
+            next_cursor = str(ref_of(page[-1]))
+        questions = page
+
+    # one id__in query per question type instead of one query per question
+    ids_by_type = {"mcq": [], "coding": [], "rearrange": []}
+    for sq in questions:
+        q_type = sq.get("question_type")
+        ref = ref_of(sq)
+        if ref is not None:
+            ids_by_type[q_type].append(ref)
+
+    mcq_map = {m.id: m for m in SectionMCQ.objects(id__in=ids_by_type["mcq"])} if ids_by_type["mcq"] else {}
+    coding_map = {
+        q.id: q for q in SectionCodingQuestion.objects(id__in=ids_by_type["coding"]).no_dereference()
+    } if ids_by_type["coding"] else {}
+    rearrange_map = {
+        r.id: r for r in SectionRearrange.objects(id__in=ids_by_type["rearrange"])
+    } if ids_by_type["rearrange"] else {}
+
     questions_data = []
-    for sq in section.questions or []:
-        q_type = sq.question_type
+    for sq in questions:
+        q_type = sq.get("question_type")
+        ref = ref_of(sq)
         q_obj = None
 
-        if q_type == "mcq":
-            try:
-                # attempt to dereference (may raise DoesNotExist)
-                if sq.mcq_ref:
-                    q_obj = sq.mcq_ref.to_json()
-            except DoesNotExist:
-                # missing referenced TestMCQ — produce a placeholder instead of crashing
-                # try to read the raw DBRef id if available
-                raw = getattr(sq, "_data", {}).get("mcq_ref")
-                ref_id = getattr(raw, "id", None) or str(raw) if raw else None
-                q_obj = {"id": str(ref_id), "missing": True, "note": "Referenced test_mcq not found"}
-        elif q_type == "coding":
-            try:
-                if sq.coding_ref:
-                    q_obj = sq.coding_ref.to_safe_json()
-            except DoesNotExist:
-                q_obj = {"missing": True, "note": "Referenced coding question not found"}
-        elif q_type == "rearrange":
-            try:
-                if sq.rearrange_ref:
-                    q_obj = sq.rearrange_ref.to_json()
-            except DoesNotExist:
-                q_obj = {"missing": True, "note": "Referenced rearrange question not found"}
+        if q_type == "mcq" and ref is not None:
+            mcq = mcq_map.get(ref)
+            # missing referenced TestMCQ — produce a placeholder instead of crashing
+            q_obj = mcq.to_json() if mcq else {"id": str(ref), "missing": True, "note": "Referenced test_mcq not found"}
+        elif q_type == "coding" and ref is not None:
+            q = coding_map.get(ref)
+            q_obj = q.to_safe_json() if q else {"missing": True, "note": "Referenced coding question not found"}
+        elif q_type == "rearrange" and ref is not None:
+            r = rearrange_map.get(ref)
+            q_obj = r.to_json() if r else {"missing": True, "note": "Referenced rearrange question not found"}
 
         if q_obj:
             questions_data.append({
@@ -314,7 +425,9 @@ def get_questions_by_section(section_id):
                 "data": q_obj
             })
 
-    return response(True, "Questions fetched", questions_data), 200
+    if paginate:
+        return etag_response(True, "Questions fetched", {"questions": questions_data, "next_cursor": next_cursor})
+    return etag_response(True, "Questions fetched", questions_data)
 
 
 # DELETE /sections/<section_id>
@@ -327,12 +440,15 @@ def delete_section(section_id):
     - Deletes the Section itself (and cascades to its questions).
     """
     try:
-        section = Section.objects.get(id=section_id)
+        # the cascade only needs the question ref ids, not the question documents
+        section = Section.objects(id=section_id).no_dereference().get()
     except (DoesNotExist, ValidationError):
         return response(False, "Section not found"), 404
 
     try:
-        # Remove section reference from all tests
+        # Remove section reference from all tests (and their cached meta: total_sections changes)
+        for t in Test.objects(Q(sections_time_restricted=section) | Q(sections_open=section)).only("id").as_pymongo():
+            invalidate_test_meta(t["_id"])
         Test.objects(sections_time_restricted=section).update(pull__sections_time_restricted=section)
         Test.objects(sections_open=section).update(pull__sections_open=section)
 
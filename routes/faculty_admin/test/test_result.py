@@ -7,8 +7,10 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from mongoengine.errors import DoesNotExist
 from utils.jwt import create_access_token, verify_access_token
 from utils.response import response
+from utils.cache import get_test_meta, set_test_meta
 from models.test.test import Test
 from models.test.students_test_attempt import StudentTestAttempt
+from utils.search import prefix_search_filter
 
 from mongoengine.queryset.visitor import Q
 
@@ -17,11 +19,53 @@ from mongoengine.queryset.visitor import Q
 from models.questions.coding import Submission  # adjust path to your actual Submission model import
 from bson import ObjectId
 
-def _choose_best_submission_id_from_value(value):
-    print(value)
+# most attempts returned by one result page
+_MAX_RESULTS_PAGE = 500
+
+# Submission fields returned for picking and summarising the best submission, plus
+# `eff`, the effective score: total_score (0 when unset, like the model default), or the
+# sum of case_results.points_awarded when total_score is null. case_results itself
+# (stdout/stderr per test case) never leaves the server.
+_SUBMISSION_SUMMARY_PROJECTION = {
+    "total_score": 1, "verdict": 1, "created_at": 1, "source_code": 1, "language": 1,
+    "eff": {"$cond": [
+        {"$eq": ["$total_score", None]},
+        {"$sum": "$case_results.points_awarded"},
+        {"$ifNull": ["$total_score", 0]},
+    ]},
+}
+
+
+def _submission_ids_from_value(value):
+    """Submission id strings held by a coding answer value (list, or dict with submission_ids/ids)."""
+    if isinstance(value, dict) and "submission_ids" in value:
+        ids = value.get("submission_ids") or []
+    elif isinstance(value, dict) and "ids" in value:
+        ids = value.get("ids") or []
+    elif isinstance(value, (list, tuple)):
+        ids = list(value)
+    else:
+        return []
+    return [str(x) for x in ids if x]
+
+
+def _fetch_submissions(ids):
+    """Submission summaries (with the server-computed `eff` score) for `ids`, keyed by id string."""
+    oids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+    if not oids:
+        return {}
+    subs = Submission._get_collection().aggregate([
+        {"$match": {"_id": {"$in": oids}}},
+        {"$project": _SUBMISSION_SUMMARY_PROJECTION},
+    ])
+    return {str(s["_id"]): s for s in subs}
+
+
+def _choose_best_submission_id_from_value(value, subs_by_id=None):
     """
     If value is a list/iterable of submission ids (strings/ObjectIds),
     pick the submission id with the maximum score.
+    subs_by_id: submissions already fetched by _fetch_submissions (skips the query).
     Returns (best_submission_id_or_none, selected_summary_or_none)
     """
     try:
@@ -33,94 +77,38 @@ def _choose_best_submission_id_from_value(value):
         if isinstance(value, (str, ObjectId)):
             return str(value), None
 
-        # If value is a dict that stores ids under some key (defensive)
-        if isinstance(value, dict) and "submission_ids" in value:
-            ids = value.get("submission_ids") or []
-        elif isinstance(value, dict) and "ids" in value:
-            ids = value.get("ids") or []
-        elif isinstance(value, (list, tuple)):
-            ids = list(value)
-        else:
-            # unknown shape: do nothing
-            return None, None
-
-        # normalize and filter valid-looking ids
-        normalized_ids = []
-        for x in ids:
-            if not x:
-                continue
-            try:
-                normalized_ids.append(str(x))
-            except Exception:
-                continue
-
+        # list, or a dict that stores ids under some key (defensive); unknown shapes give []
+        normalized_ids = _submission_ids_from_value(value)
         if not normalized_ids:
             return None, None
 
-        # Fetch submissions in one DB hit
-        subs_qs = Submission.objects(id__in=normalized_ids).only(
-            "id", "total_score", "case_results", "verdict", "created_at","source_code","language"
-        )
-        print(subs_qs)
+        if subs_by_id is None:
+            subs_by_id = _fetch_submissions(normalized_ids)
+        subs = [subs_by_id[i] for i in normalized_ids if i in subs_by_id]
 
         # If none found, return None
-        subs = list(subs_qs)
         if not subs:
             return None, None
 
-        # Compute a numeric score for each submission:
-        # Prefer total_score if > 0, otherwise sum case_results.points_awarded
-        def submission_effective_score(s):
-            try:
-                # prefer numeric total_score
-                if getattr(s, "total_score", None) is not None:
-                    try:
-                        return int(getattr(s, "total_score") or 0)
-                    except Exception:
-                        pass
-                # fallback: sum case_results.points_awarded
-                crs = getattr(s, "case_results", []) or []
-                total = 0
-                for cr in crs:
-                    try:
-                        total += int(getattr(cr, "points_awarded", 0) or 0)
-                    except Exception:
-                        continue
-                return total
-            except Exception:
-                return 0
-
         # choose best: highest effective score, tie-breaker latest created_at
-        best = None
-        best_score = None
-        for s in subs:
-            score = submission_effective_score(s)
-            if best is None or score > best_score:
-                best, best_score = s, score
-            elif score == best_score:
-                # tie-breaker: newest updated/created
-                try:
-                    if getattr(s, "created_at", None) and getattr(best, "created_at", None):
-                        if s.created_at > best.created_at:
-                            best = s
-                except Exception:
-                    pass
+        best = max(subs, key=lambda s: (s.get("eff") or 0, s.get("created_at") or datetime.min))
+        best_score = best.get("eff") or 0
 
         if not best:
             return None, None
 
         # Build a small summary for frontend (optional but helpful)
         selected_summary = {
-            "submission_id": str(best.id),
+            "submission_id": str(best["_id"]),
             "score": best_score,
-            "total_score_field": getattr(best, "total_score", None),
-            "verdict": getattr(best, "verdict", None),
-            "created_at": getattr(best, "created_at", None),
-            "source_code" : getattr(best,"source_code",None),
-            "language" : getattr(best,"language",None)
+            "total_score_field": best.get("total_score", 0),
+            "verdict": best.get("verdict", "Pending"),
+            "created_at": best.get("created_at"),
+            "source_code" : best.get("source_code"),
+            "language" : best.get("language")
         }
 
-        return str(best.id), selected_summary
+        return str(best["_id"]), selected_summary
 
     except Exception as e:
         # Don't let this break the whole response; log and move on
@@ -128,6 +116,73 @@ def _choose_best_submission_id_from_value(value):
         return None, None
 
 
+def _after_cursor_q(field, descending, value, oid):
+    """
+    Keyset filter: attempts that come after the row (value, oid) when sorted by
+    order_by(±field, ±id). Mongo sorts nulls first ascending and last descending.
+    """
+    if value is None:
+        if descending:
+            return Q(**{field: None}) & Q(id__lt=oid)
+        return Q(**{f"{field}__ne": None}) | (Q(**{field: None}) & Q(id__gt=oid))
+    op = "lt" if descending else "gt"
+    q = Q(**{f"{field}__{op}": value}) | (Q(**{field: value}) & Q(**{f"id__{op}": oid}))
+    if descending:
+        q |= Q(**{field: None})
+    return q
+
+
+def _resolve_after_cursor(after, field, descending):
+    """Turn an `after` attempt id into a keyset Q; returns (q, error_message)."""
+    if not ObjectId.is_valid(after):
+        return None, "invalid after cursor"
+    anchor = StudentTestAttempt.objects(id=after).only(field).as_pymongo().first()
+    if anchor is None:
+        return None, "invalid after cursor"
+    return _after_cursor_q(field, descending, anchor.get(field), anchor["_id"]), None
+
+
+# tab-switch totals over every attempt matched, not just the current page; appended to
+# the filter's $match as its own aggregation (the page runs separately so it can use
+# the (test_id, -submitted_at, -id) index)
+_TABS_SUMMARY_GROUP = [
+    {"$group": {
+        "_id": None,
+        "total": {"$sum": {"$ifNull": ["$tab_switches_count", 0]}},
+        "max": {"$max": {"$ifNull": ["$tab_switches_count", 0]}},
+        "nonzero": {"$sum": {"$cond": [{"$gt": ["$tab_switches_count", 0]}, 1, 0]}},
+        "count": {"$sum": 1},
+    }},
+]
+
+
+def _tabs_summary(summary_rows):
+    """tabs_summary payload from the _TABS_SUMMARY_GROUP output."""
+    row = summary_rows[0] if summary_rows else {}
+    count = row.get("count", 0)
+    total = row.get("total", 0)
+    nonzero = row.get("nonzero", 0)
+    return {
+        "total_tab_switches": total,
+        "avg_tab_switches_per_attempt": (total / count) if count else 0,
+        "max_tab_switches": row.get("max", 0),
+        "attempts_with_tab_switches": nonzero,
+        "attempts_with_tab_switches_percent": (nonzero / count * 100) if count else 0,
+    }
+
+
+def _test_minimal_json(test_id):
+    """Test.to_minimal_json(), cached for a minute (see utils/cache.py); None if missing."""
+    meta = get_test_meta(test_id)
+    if meta is None:
+        # to_minimal_json only counts the section refs
+        t = Test.objects(id=str(test_id)).no_dereference().first()
+        if t:
+            meta = t.to_minimal_json()
+            set_test_meta(test_id, meta)
+    return meta
+
+
 def token_required(f):
     """Decorator to protect routes using Authorization: Bearer <token>"""
     from functools import wraps
@@ -157,9 +212,11 @@ faculty_test_result_bp = Blueprint("faculty_test_result_bp", __name__, url_prefi
 @token_required
 def list_student_results_for_test():
     """
-    GET /api/students/results?test_id=<id>&search=<name|email>&limit=&offset=&sort_by=&order=
+    GET /api/students/results?test_id=<id>&search=<name|email>&limit=&offset=&sort_by=&order=&after=
     - test_id is MANDATORY.
     - Returns attempts for that test only. Optional search filters students by name/email.
+    - after: next_cursor from the previous page; seeks past it instead of skipping `offset` rows.
+    - limit is capped at _MAX_RESULTS_PAGE; the response carries the effective limit and has_next.
     """
     from models.student import Student
 
@@ -180,6 +237,23 @@ def list_student_results_for_test():
         sort_by = "submitted_at"
     order = (request.args.get("order") or "desc").strip().lower()
     order_prefix = "-" if order == "desc" else ""
+    after = (request.args.get("after") or "").strip()
+    # same hard cap as the per-student endpoint: a whole class is fetched page by page
+    # (after=next_cursor), keeping each response bounded; the effective limit and has_next are returned
+    page_limit = max(min(limit, _MAX_RESULTS_PAGE), 1)
+
+    # fetch test meta (name + description)
+    test_meta = None
+    try:
+        t = _test_minimal_json(test_id)
+        if t:
+            test_meta = {
+                "id": t["id"],
+                "test_name": t["test_name"],
+                "description": t["description"],
+            }
+    except Exception:
+        test_meta = None
 
     # Build base query: filter only by test_id
     query = Q(test_id=str(test_id))
@@ -187,123 +261,124 @@ def list_student_results_for_test():
     # If search provided, find student ids matching name/email, then restrict attempts to those students
     if search:
         try:
-            students_qs = Student.objects(Q(name__icontains=search) | Q(email__icontains=search)).only("id")
-            student_ids = [str(s.id) for s in students_qs]
+            # one token: anchored prefix match on name/usn/email; several words: text index
+            prefix_q = prefix_search_filter(search)
+            if prefix_q is not None:
+                students_qs = Student.objects(prefix_q)
+            else:
+                students_qs = Student.objects.search_text(search)
+            students_qs = students_qs.only("id").as_pymongo()
+            student_ids = [str(s["_id"]) for s in students_qs]
         except Exception as e:
             current_app.logger.exception("Error searching students: %s", e)
             return response(False, "error searching students"), 500
 
         if not student_ids:
-            return response(True, "results fetched", {"results": [], "total": 0, "limit": limit, "offset": offset}), 200
+            # same shape as a normal page, just empty
+            return response(True, "results fetched", {
+                "test": test_meta,
+                "results": [],
+                "total": 0,
+                "limit": page_limit,
+                "offset": offset,
+                "next_cursor": None,
+                "has_next": False,
+                "tabs_summary": _tabs_summary([]),
+            }), 200
 
         query &= Q(student_id__in=student_ids)
 
     # fetch attempts (materialize to list so we can iterate multiple times)
     try:
-        total = StudentTestAttempt.objects(query).count()
-        attempts_qs = list(
-            StudentTestAttempt.objects(query)
-            .order_by(f"{order_prefix}{sort_by}")
-            .skip(max(offset, 0))
-            .limit(max(limit, 1))
-            .only(
-    "id", "student_id", "test_id", "total_marks", "max_marks",
-    "submitted", "submitted_at", "last_autosave",
-    "tab_switches_count", "fullscreen_violated"
-)
-
-        )
+        page_q, skip = query, max(offset, 0)
+        if after:
+            after_q, error = _resolve_after_cursor(after, sort_by, order_prefix == "-")
+            if error:
+                return response(False, error), 400
+            page_q, skip = query & after_q, 0
+        direction = -1 if order_prefix == "-" else 1
+        # page the attempts and join each one's student on the server (attempt.student_id
+        # is a string, so it is converted before matching students._id); $match/$sort/$limit
+        # lead the pipeline so they run on the (test_id, -submitted_at, -id) index
+        page_pipeline = [
+            {"$match": StudentTestAttempt.objects(page_q)._query},
+            # _id breaks ties so the keyset cursor is unambiguous
+            {"$sort": {sort_by: direction, "_id": direction}},
+            {"$skip": skip},
+            {"$limit": page_limit + 1},  # one extra row tells whether another page exists
+            {"$lookup": {
+                "from": Student._get_collection_name(),
+                "let": {"sid": {"$convert": {"input": "$student_id", "to": "objectId", "onError": None, "onNull": None}}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$sid"]}}},
+                    {"$project": {"name": 1, "email": 1}},
+                ],
+                "as": "student",
+            }},
+            {"$unwind": {"path": "$student", "preserveNullAndEmptyArrays": True}},
+            {"$project": {
+                "student_id": 1, "test_id": 1, "total_marks": 1, "max_marks": 1,
+                "submitted": 1, "submitted_at": 1, "last_autosave": 1,
+                "tab_switches_count": 1, "fullscreen_violated": 1, "student": 1,
+            }},
+        ]
+        coll = StudentTestAttempt._get_collection()
+        attempts_qs = list(coll.aggregate(page_pipeline))
+        has_next = len(attempts_qs) > page_limit
+        attempts_qs = attempts_qs[:page_limit]
+        # the tabs summary covers the full filtered set; its $group also gives the total
+        summary_rows = list(coll.aggregate(
+            [{"$match": StudentTestAttempt.objects(query)._query}, *_TABS_SUMMARY_GROUP]
+        ))
+        total = summary_rows[0]["count"] if summary_rows else 0
     except Exception as e:
         current_app.logger.exception("Error querying StudentTestAttempt: %s", e)
-        # print(e)
         return response(False, "error fetching results"), 500
 
-    # fetch test meta (name + description)
-    test_meta = None
-    try:
-        t = Test.objects(id=str(test_id)).first()
-        if t:
-            test_meta = {
-                "id": str(t.id),
-                "test_name": t.test_name,
-                "description": t.description,
-            }
-    except Exception:
-        test_meta = None
-
-    # collect student_ids from attempts to fetch student details in one shot
-    attempt_student_ids = {str(getattr(a, "student_id", "")) for a in attempts_qs if getattr(a, "student_id", None)}
-    student_map = {}
-    if attempt_student_ids:
-        try:
-            students_for_attempts = Student.objects(id__in=list(attempt_student_ids)).only("id", "name", "email")
-            for s in students_for_attempts:
-                student_map[str(s.id)] = {"id": str(s.id), "name": getattr(s, "name", ""), "email": getattr(s, "email", "")}
-        except Exception as e:
-            current_app.logger.exception("Error fetching students for attempts: %s", e)
-            student_map = {}
-
     results = []
-    # summary accumulators for tabs only
-    total_tab_switches = 0
-    max_tab_switches = 0
-    attempts_with_nonzero_tab_switches = 0
 
     # helper: extract tab switch count robustly
     def _extract_tab_switch_count(a):
-        val = getattr(a, "tab_switches_count", None)
+        val = a.get("tab_switches_count", 0)
         try:
             return int(val) if val is not None else 0
         except Exception:
             return 0
 
     for a in attempts_qs:
-        sid = str(getattr(a, "student_id", "") or "")
-        student_info = student_map.get(sid, None)
+        sid = str(a.get("student_id") or "")
+        s = a.get("student")
+        student_info = {"id": str(s["_id"]), "name": s.get("name"), "email": s.get("email")} if s else None
 
         # full-screen: prefer canonical field, then legacy names
         full_screen = bool(
-            getattr(a, "fullscreen_violated", None)
-            or getattr(a, "full_screen", None)
-            or getattr(a, "is_fullscreen", None)
+            a.get("fullscreen_violated")
+            or a.get("full_screen")
+            or a.get("is_fullscreen")
             or False
         )
 
         tab_switch_count = _extract_tab_switch_count(a)
 
-        # update summary accumulators
-        total_tab_switches += tab_switch_count
-        if tab_switch_count > max_tab_switches:
-            max_tab_switches = tab_switch_count
-        if tab_switch_count > 0:
-            attempts_with_nonzero_tab_switches += 1
-
         results.append({
-            "id": str(getattr(a, "id", "")),
+            "id": str(a["_id"]),
             "student_id": sid,
             "student": student_info,
 
-            "test_id": str(getattr(a, "test_id", "")),
-            "total_marks": float(getattr(a, "total_marks", 0) or 0),
-            "max_marks": float(getattr(a, "max_marks", 0) or 0),
+            "test_id": str(a.get("test_id", "")),
+            "total_marks": float(a.get("total_marks", 0) or 0),
+            "max_marks": float(a.get("max_marks", 0) or 0),
 
-            "submitted": bool(getattr(a, "submitted", False)),
-            "submitted_at": getattr(a, "submitted_at", None),
-            "last_autosave": getattr(a, "last_autosave", None),
+            "submitted": bool(a.get("submitted", False)),
+            "submitted_at": a.get("submitted_at"),
+            "last_autosave": a.get("last_autosave"),
 
             # UI / session telemetry (only full-screen + tabs)
             "full_screen": full_screen,
             "tab_switch_count": tab_switch_count,
         })
 
-    # Build summary object for tabs so frontend can display tab metrics
-    tabs_summary = {
-        "total_tab_switches": total_tab_switches,
-        "avg_tab_switches_per_attempt": (total_tab_switches / len(results)) if results else 0,
-        "max_tab_switches": max_tab_switches,
-        "attempts_with_tab_switches": attempts_with_nonzero_tab_switches,
-        "attempts_with_tab_switches_percent": (attempts_with_nonzero_tab_switches / len(results) * 100) if results else 0,
-    }
+    tabs_summary = _tabs_summary(summary_rows)
 
     return response(
         True,
@@ -312,8 +387,10 @@ def list_student_results_for_test():
             "test": test_meta,
             "results": results,
             "total": total,
-            "limit": limit,
+            "limit": page_limit,
             "offset": offset,
+            "next_cursor": results[-1]["id"] if has_next else None,
+            "has_next": has_next,
             "tabs_summary": tabs_summary,
             # violations intentionally removed as requested
         },
@@ -324,7 +401,7 @@ def list_student_results_for_test():
 @token_required
 def get_results_by_student_for_test(student_id):
     """
-    GET /api/students/<student_id>/results?test_id=<id>&limit=&offset=&include_snapshots=(true|false)
+    GET /api/students/<student_id>/results?test_id=<id>&limit=&offset=&after=&include_snapshots=(true|false)
     - test_id is MANDATORY.
     - Returns attempts for that student for the given test (paginated).
     - include_snapshots: whether to include section snapshots and question snapshots (defaults to true).
@@ -354,26 +431,40 @@ def get_results_by_student_for_test(student_id):
 
     # Filter only by student_id + test_id
     query = Q(student_id=str(student_id)) & Q(test_id=str(test_id))
+    after = (request.args.get("after") or "").strip()
+    page_limit = max(min(limit, _MAX_RESULTS_PAGE), 1)  # hard cap to avoid huge responses
 
     try:
-        total = StudentTestAttempt.objects(query).count()
-        attempts_qs = (
-            StudentTestAttempt.objects(query)
-            .order_by("-submitted_at")
-            .skip(max(offset, 0))
-            .limit(max(min(limit, 500), 1))  # hard cap of 500 by default to avoid huge responses
-        )
+        page_q, skip = query, max(offset, 0)
+        if after:
+            after_q, error = _resolve_after_cursor(after, "submitted_at", True)
+            if error:
+                return response(False, error), 400
+            page_q, skip = query & after_q, 0
+        page_pipeline = [
+            {"$match": StudentTestAttempt.objects(page_q)._query},
+            {"$sort": {"submitted_at": -1, "_id": -1}},
+            {"$skip": skip},
+            {"$limit": page_limit},
+        ]
+        if not include_snapshots:
+            # the answer/snapshot subtrees are the bulk of an attempt; drop them on the server
+            page_pipeline.append({"$project": {"timed_section_answers": 0, "open_section_answers": 0}})
+        coll = StudentTestAttempt._get_collection()
+        attempts_qs = list(coll.aggregate(page_pipeline))
+        # tabs summary over all matched attempts; its $group also gives the total
+        summary_rows = list(coll.aggregate(
+            [{"$match": StudentTestAttempt.objects(query)._query}, *_TABS_SUMMARY_GROUP]
+        ))
+        total = summary_rows[0]["count"] if summary_rows else 0
     except Exception as e:
         current_app.logger.exception("Error querying StudentTestAttempt: %s", e)
         return response(False, "error fetching results"), 500
 
     # Optionally include test meta
-    from models.test.test import Test
     test_meta = None
     try:
-        t = Test.objects(id=str(test_id)).first()
-        if t:
-            test_meta = t.to_minimal_json()
+        test_meta = _test_minimal_json(test_id)
     except Exception:
         test_meta = None
 
@@ -382,66 +473,83 @@ def get_results_by_student_for_test(student_id):
         if not snap:
             return None
         return {
-            "question_id": getattr(snap, "question_id", None),
-            "title": getattr(snap, "title", None),
-            "question_text": getattr(snap, "question_text", None),
-            "options": getattr(snap, "options", []) or [],
-            "is_multiple": bool(getattr(snap, "is_multiple", False)),
-            "marks": float(getattr(snap, "marks", 0) or 0.0),
-            "negative_marks": float(getattr(snap, "negative_marks", 0) or 0.0),
-            "correct_options": getattr(snap, "correct_options", []) or [],    # faculty view includes corrects
-            "explanation": getattr(snap, "explanation", None),
+            "question_id": snap.get("question_id", None),
+            "title": snap.get("title", None),
+            "question_text": snap.get("question_text", None),
+            "options": snap.get("options", []) or [],
+            "is_multiple": bool(snap.get("is_multiple", False)),
+            "marks": float(snap.get("marks", 0) or 0.0),
+            "negative_marks": float(snap.get("negative_marks", 0) or 0.0),
+            "correct_options": snap.get("correct_options", []) or [],    # faculty view includes corrects
+            "explanation": snap.get("explanation", None),
         }
 
     def _rearrange_snapshot_to_dict(snap):
         if not snap:
             return None
         return {
-            "question_id": getattr(snap, "question_id", None),
-            "title": getattr(snap, "title", None),
-            "prompt": getattr(snap, "prompt", None),
-            "items": getattr(snap, "items", []) or [],
-            "is_drag_and_drop": bool(getattr(snap, "is_drag_and_drop", True)),
-            "marks": float(getattr(snap, "marks", 0) or 0.0),
-            "negative_marks": float(getattr(snap, "negative_marks", 0) or 0.0),
-            "correct_order": getattr(snap, "correct_order", []) or [],      # faculty view includes correct order
-            "explanation": getattr(snap, "explanation", None),
+            "question_id": snap.get("question_id", None),
+            "title": snap.get("title", None),
+            "prompt": snap.get("prompt", None),
+            "items": snap.get("items", []) or [],
+            "is_drag_and_drop": bool(snap.get("is_drag_and_drop", True)),
+            "marks": float(snap.get("marks", 0) or 0.0),
+            "negative_marks": float(snap.get("negative_marks", 0) or 0.0),
+            "correct_order": snap.get("correct_order", []) or [],      # faculty view includes correct order
+            "explanation": snap.get("explanation", None),
         }
 
     def _coding_snapshot_to_dict(snap):
         if not snap:
             return None
         return {
-            "question_id": getattr(snap, "question_id", None),
-            "title": getattr(snap, "title", None),
-            "short_description": getattr(snap, "short_description", None),
-            "long_description_markdown": getattr(snap, "long_description_markdown", None),
-            "sample_io": getattr(snap, "sample_io", []) or [],
-            "allowed_languages": getattr(snap, "allowed_languages", []) or [],
-            "predefined_boilerplates": getattr(snap, "predefined_boilerplates", {}) or {},
-            "run_code_enabled": bool(getattr(snap, "run_code_enabled", True)),
-            "submission_enabled": bool(getattr(snap, "submission_enabled", True)),
-            "marks": float(getattr(snap, "marks", 0) or 0.0),
-            "negative_marks": float(getattr(snap, "negative_marks", 0) or 0.0),
+            "question_id": snap.get("question_id", None),
+            "title": snap.get("title", None),
+            "short_description": snap.get("short_description", None),
+            "long_description_markdown": snap.get("long_description_markdown", None),
+            "sample_io": snap.get("sample_io", []) or [],
+            "allowed_languages": snap.get("allowed_languages", []) or [],
+            "predefined_boilerplates": snap.get("predefined_boilerplates", {}) or {},
+            "run_code_enabled": bool(snap.get("run_code_enabled", True)),
+            "submission_enabled": bool(snap.get("submission_enabled", True)),
+            "marks": float(snap.get("marks", 0) or 0.0),
+            "negative_marks": float(snap.get("negative_marks", 0) or 0.0),
         }
 
+    def _is_coding(ans):
+        return (ans.get("question_type", None) or "").lower() in ("coding", "code", "coding_question")
+
+    # every submission referenced by the page's coding answers, fetched in one query
+    # (answers are only serialized along with the snapshots)
+    subs_by_id = None
+    if include_snapshots:
+        coding_ids = set()
+        for a in attempts_qs:
+            for sec in (a.get("timed_section_answers") or []) + (a.get("open_section_answers") or []):
+                for ans in (sec.get("answers") or []):
+                    if _is_coding(ans):
+                        coding_ids.update(_submission_ids_from_value((ans.get("value") or {}).get("value")))
+        try:
+            subs_by_id = _fetch_submissions(coding_ids)
+        except Exception as e:
+            current_app.logger.exception("error prefetching submissions: %s", e)
+            subs_by_id = None
+
     def _student_answer_to_dict(ans):
         if not ans:
             return None
         base = {
-            "question_id": getattr(ans, "question_id", None),
-            "question_type": getattr(ans, "question_type", None),
-            "value": getattr(ans, "value", None),
-            "marks_obtained": None if getattr(ans, "marks_obtained", None) is None else float(ans.marks_obtained),
+            "question_id": ans.get("question_id", None),
+            "question_type": ans.get("question_type", None),
+            "value": ans.get("value", None),
+            "marks_obtained": None if ans.get("marks_obtained") is None else float(ans["marks_obtained"]),
         }
         try:
-            qtype = (getattr(ans, "question_type", None) or "").lower()
-            # print(qtype)
-            if qtype in ("coding", "code", "coding_question"):
-                raw_value = getattr(ans, "value", None)
-                print('s',raw_value["value"])
-                best_id, selected_summary = _choose_best_submission_id_from_value(raw_value["value"])
-                # print(best_id,selected_summary)
+            if _is_coding(ans):
+                raw_value = ans.get("value", None)
+                if current_app.debug:
+                    current_app.logger.debug("coding answer submission ids: %s", raw_value["value"])
+                best_id, selected_summary = _choose_best_submission_id_from_value(raw_value["value"], subs_by_id)
                 if best_id:
                     base["value"] = selected_summary
                     # optionally include a selected_submission summary for UI convenience
@@ -450,60 +558,57 @@ def get_results_by_student_for_test(student_id):
                     # fallback: leave value as-is (may be None or list)
                     base["value"] = raw_value
         except Exception as e:
-            current_app.logger.exception("error resolving coding submission ids: %s", e)        # include snapshots only when requested
+            current_app.logger.exception("error resolving coding submission ids: %s", e)
+        # include snapshots only when requested
         if include_snapshots:
-            if getattr(ans, "snapshot_mcq", None):
-                base["snapshot_mcq"] = _mcq_snapshot_to_dict(ans.snapshot_mcq)
-            if getattr(ans, "snapshot_rearrange", None):
-                base["snapshot_rearrange"] = _rearrange_snapshot_to_dict(ans.snapshot_rearrange)
-            if getattr(ans, "snapshot_coding", None):
-                base["snapshot_coding"] = _coding_snapshot_to_dict(ans.snapshot_coding)
+            if ans.get("snapshot_mcq", None):
+                base["snapshot_mcq"] = _mcq_snapshot_to_dict(ans["snapshot_mcq"])
+            if ans.get("snapshot_rearrange", None):
+                base["snapshot_rearrange"] = _rearrange_snapshot_to_dict(ans["snapshot_rearrange"])
+            if ans.get("snapshot_coding", None):
+                base["snapshot_coding"] = _coding_snapshot_to_dict(ans["snapshot_coding"])
         return base
 
     def _section_answers_to_dict(sec):
         if not sec:
             return None
         return {
-            "section_id": getattr(sec, "section_id", None),
-            "section_name": getattr(sec, "section_name", None),
-            "section_duration": int(getattr(sec, "section_duration", 0) or 0),
-            "answers": [ _student_answer_to_dict(a) for a in (getattr(sec, "answers", []) or []) ],
+            "section_id": sec.get("section_id", None),
+            "section_name": sec.get("section_name", None),
+            "section_duration": int(sec.get("section_duration", 0) or 0),
+            "answers": [ _student_answer_to_dict(a) for a in (sec.get("answers", []) or []) ],
         }
 
     results = []
-    # summary accumulators for tabs only
-    total_tab_switches = 0
-    max_tab_switches = 0
-    attempts_with_nonzero_tab_switches = 0
 
     for a in attempts_qs:
         item = {
-            "id": str(getattr(a, "id", "")),
-            "student_id": str(getattr(a, "student_id", "")),
-            "test_id": str(getattr(a, "test_id", "")),
+            "id": str(a["_id"]),
+            "student_id": str(a.get("student_id", "")),
+            "test_id": str(a.get("test_id", "")),
             "test": test_meta,
-            "total_marks": float(getattr(a, "total_marks", 0) or 0),
-            "max_marks": float(getattr(a, "max_marks", 0) or 0),
+            "total_marks": float(a.get("total_marks", 0) or 0),
+            "max_marks": float(a.get("max_marks", 0) or 0),
 
-            "submitted": bool(getattr(a, "submitted", False)),
-            "submitted_at": getattr(a, "submitted_at", None),
-            "last_autosave": getattr(a, "last_autosave", None),
+            "submitted": bool(a.get("submitted", False)),
+            "submitted_at": a.get("submitted_at"),
+            "last_autosave": a.get("last_autosave"),
         }
 
         # Best-effort extraction of full-screen / tab-switch info (safe fallbacks)
-        full_screen = bool(getattr(a, "full_screen", None) or getattr(a, "is_fullscreen", None) or False)
+        full_screen = bool(a.get("full_screen") or a.get("is_fullscreen") or False)
 
         tab_switch_count = 0
-        ts_val = getattr(a, "tab_switch_count", None)
+        ts_val = a.get("tab_switch_count")
         if ts_val is None:
-            ts_list = getattr(a, "tab_switches", None) or getattr(a, "tab_focus_events", None)
+            ts_list = a.get("tab_switches") or a.get("tab_focus_events")
             if ts_list is None:
-                ts_list = getattr(a, "tabs", None)
+                ts_list = a.get("tabs")
             if isinstance(ts_list, (list, tuple)):
                 tab_switch_count = len(ts_list)
             else:
                 try:
-                    tab_switch_count = int(getattr(a, "tab_switches_count", 0) or 0)
+                    tab_switch_count = int(a.get("tab_switches_count", 0) or 0)
                 except Exception:
                     tab_switch_count = 0
         else:
@@ -516,14 +621,14 @@ def get_results_by_student_for_test(student_id):
         if include_snapshots:
             try:
                 item["timed_section_answers"] = [
-                    _section_answers_to_dict(s) for s in (getattr(a, "timed_section_answers", []) or [])
+                    _section_answers_to_dict(s) for s in (a.get("timed_section_answers") or [])
                 ]
                 item["open_section_answers"] = [
-                    _section_answers_to_dict(s) for s in (getattr(a, "open_section_answers", []) or [])
+                    _section_answers_to_dict(s) for s in (a.get("open_section_answers") or [])
                 ]
             except Exception as e:
                 # avoid total failure if unexpected structure; log and continue
-                current_app.logger.exception("error serializing snapshots for attempt %s: %s", getattr(a, "id", None), e)
+                current_app.logger.exception("error serializing snapshots for attempt %s: %s", a.get("_id"), e)
                 item["timed_section_answers"] = []
                 item["open_section_answers"] = []
 
@@ -531,29 +636,17 @@ def get_results_by_student_for_test(student_id):
         item["full_screen"] = full_screen
         item["tab_switch_count"] = tab_switch_count
 
-        # update summary accumulators
-        total_tab_switches += tab_switch_count
-        if tab_switch_count > max_tab_switches:
-            max_tab_switches = tab_switch_count
-        if tab_switch_count > 0:
-            attempts_with_nonzero_tab_switches += 1
-
         results.append(item)
 
-    tabs_summary = {
-        "total_tab_switches": total_tab_switches,
-        "avg_tab_switches_per_attempt": (total_tab_switches / len(results)) if results else 0,
-        "max_tab_switches": max_tab_switches,
-        "attempts_with_tab_switches": attempts_with_nonzero_tab_switches,
-        "attempts_with_tab_switches_percent": (attempts_with_nonzero_tab_switches / len(results) * 100) if results else 0,
-    }
+    tabs_summary = _tabs_summary(summary_rows)
 
     return response(True, "student results fetched", {
         "student": {"id": str(student.id), "name": getattr(student, "name", None), "email": getattr(student, "email", None)},
         "test_id": str(test_id),
         "results": results,
         "total": total,
-        "limit": limit,
+        "limit": page_limit,
         "offset": offset,
+        "next_cursor": results[-1]["id"] if len(results) == page_limit else None,
         "tabs_summary": tabs_summary
     }), 200
@@ -0,0 +1,94 @@
+# utils/cache.py
+import time
+from threading import Lock
+
+from cachetools import TTLCache
+
+# distinct branch / year_of_study / semester values per college (student list filters)
+_student_meta_cache = TTLCache(maxsize=512, ttl=300)
+_student_meta_lock = Lock()
+
+
+def _college_key(college) -> str:
+    """Accepts a College document, DBRef, ObjectId or plain id string."""
+    return str(getattr(college, "id", college))
+
+
+def get_student_meta(college):
+    with _student_meta_lock:
+        return _student_meta_cache.get(_college_key(college))
+
+
+def set_student_meta(college, meta: dict):
+    with _student_meta_lock:
+        _student_meta_cache[_college_key(college)] = meta
+
+
+def invalidate_student_meta(college):
+    """Drop cached filter values for a college after its students change."""
+    if not college:
+        return
+    with _student_meta_lock:
+        _student_meta_cache.pop(_college_key(college), None)
+
+
+# topic / subtopic / tag / difficulty dropdown values per question collection
+_question_facets_cache = TTLCache(maxsize=32, ttl=60)
+_question_facets_lock = Lock()
+
+
+def get_question_facets(collection_name):
+    with _question_facets_lock:
+        return _question_facets_cache.get(collection_name)
+
+
+def set_question_facets(collection_name, facets: dict):
+    with _question_facets_lock:
+        _question_facets_cache[collection_name] = facets
+
+
+# decoded JWT payloads keyed by the raw token; a hit skips the signature check
+_token_payload_cache = TTLCache(maxsize=10_000, ttl=60)
+_token_payload_lock = Lock()
+
+
+def get_token_payload(token: str):
+    """Cached payload for `token`, or None when missing or past its own exp."""
+    with _token_payload_lock:
+        payload = _token_payload_cache.get(token)
+    if payload is None:
+        return None
+    exp = payload.get("exp")
+    if exp is not None and exp <= time.time():
+        with _token_payload_lock:
+            _token_payload_cache.pop(token, None)
+        return None
+    return payload
+
+
+def set_token_payload(token: str, payload: dict):
+    with _token_payload_lock:
+        _token_payload_cache[token] = payload
+
+
+# Test.to_minimal_json() per test id (faculty result pages)
+_test_meta_cache = TTLCache(maxsize=1024, ttl=60)
+_test_meta_lock = Lock()
+
+
+def get_test_meta(test_id):
+    with _test_meta_lock:
+        return _test_meta_cache.get(str(test_id))
+
+
+def set_test_meta(test_id, meta: dict):
+    with _test_meta_lock:
+        _test_meta_cache[str(test_id)] = meta
+
+
+def invalidate_test_meta(test_id):
+    """Drop the cached meta of a test after it (or its section lists) change."""
+    if not test_id:
+        return
+    with _test_meta_lock:
+        _test_meta_cache.pop(str(test_id), None)
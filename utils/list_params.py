@@ -0,0 +1,52 @@
+# utils/list_params.py
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+MAX_PER_PAGE = 200
+
+# search terms shorter than this keep a substring match; $text only matches whole
+# (stemmed) words, which is too coarse for a couple of typed characters
+MIN_TEXT_SEARCH = 3
+
+
+def _to_int(value, default: int) -> int:
+    # only plain non-negative digits are accepted; anything else gets the default
+    return int(value) if value and value.isdigit() else default
+
+
+@dataclass(frozen=True)
+class ListParams:
+    """Validated query params shared by the question list endpoints."""
+    page: int
+    per_page: int
+    tags: Tuple[str, ...]
+    topic: Optional[str]
+    subtopic: Optional[str]
+    difficulty: Optional[str]
+    search: str
+    sort_by: Optional[str]
+    sort_prefix: str
+    optimize: bool
+    after_id: Optional[str]
+
+
+def parse_list_params(args, difficulty_param: str = "difficulty_level") -> ListParams:
+    """
+    Read request.args once. `difficulty_param` is the query key the endpoint
+    exposes for difficulty ("difficulty" for coding, "difficulty_level" for the rest).
+    """
+    per_page = _to_int(args.get("per_page"), 20) or 20
+    tags_param = args.get("tags")
+    return ListParams(
+        page=max(1, _to_int(args.get("page"), 1)),
+        per_page=min(per_page, MAX_PER_PAGE),
+        tags=tuple(t.strip() for t in tags_param.split(",") if t.strip()) if tags_param else (),
+        topic=args.get("topic"),
+        subtopic=args.get("subtopic"),
+        difficulty=args.get(difficulty_param),
+        search=args.get("search", "").strip(),
+        sort_by=args.get("sort_by"),
+        sort_prefix="-" if args.get("sort_dir", "desc").lower() == "desc" else "",
+        optimize=args.get("optimize", "0") == "1",
+        after_id=args.get("after_id"),
+    )
@@ -1,10 +1,58 @@
 # utils/response.py
-from flask import jsonify
+from datetime import date, datetime, time
+from decimal import Decimal
+
+import orjson
+from bson import ObjectId
+from flask import Response, request
+from flask.json.provider import JSONProvider
+from werkzeug.http import http_date
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def _default(o):
+    # dates keep the HTTP-date format jsonify used, Decimal and __html__ objects are
+    # str()'d like jsonify did, ObjectId as its hex string; anything else is a bug in
+    # the payload and raises, as it did under jsonify
+    if isinstance(o, (datetime, date)):
+        return http_date(o)
+    if isinstance(o, time):
+        return o.isoformat()
+    if isinstance(o, (ObjectId, Decimal)):
+        return str(o)
+    if hasattr(o, "__html__"):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class OrjsonProvider(JSONProvider):
+    """app.json provider: jsonify() and request.get_json() go through orjson too."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
 
 
 def response(success: bool, message: str, data=None):
-    return jsonify({
+    body = orjson.dumps({
         "success": success,
         "message": message,
         "data": data
-    })
+    }, default=_default, option=_ORJSON_OPTIONS)
+    return Response(body, mimetype="application/json")
+
+
+def etag_response(success: bool, message: str, data=None):
+    """
+    response() for GET endpoints, with a strong ETag over the body.
+    Answers 304 (empty body) when If-None-Match already holds that ETag.
+    Return it as-is, not as `(resp, 200)`, so a 304 status is kept.
+    """
+    resp = response(success, message, data)
+    resp.add_etag()
+    resp.cache_control.private = True
+    resp.cache_control.must_revalidate = True
+    return resp.make_conditional(request)
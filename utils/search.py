@@ -0,0 +1,21 @@
+# utils/search.py
+import re
+
+from mongoengine.queryset.visitor import Q
+
+# a single token (letters/digits/email punctuation) is treated as a prefix
+_PREFIX_SEARCH_RE = re.compile(r"[\w.@+-]+")
+
+
+def prefix_search_filter(q_search: str):
+    """
+    Case-insensitive prefix match on Student name / usn / email for single-token
+    searches (mongoengine escapes the value). Returns None for multi-word searches,
+    which should go through the Student text index.
+
+    The match is anchored, but a case-insensitive regex gets no tight index bound:
+    it narrows what matches compared to a substring search, not how much is scanned.
+    """
+    if not _PREFIX_SEARCH_RE.fullmatch(q_search):
+        return None
+    return Q(name__istartswith=q_search) | Q(usn__istartswith=q_search) | Q(email__istartswith=q_search)